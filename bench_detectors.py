@@ -0,0 +1,85 @@
+"""
+Compare the torch and ONNX detector backends on a set of images.
+
+    python bench_detectors.py photo1.jpg photo2.jpg [--int8] [--threads 4] [--runs 5]
+
+Reports, per model, the IoU between the box each backend picks
+(largest face / largest person) and the mean/median latency per image.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+from PIL import Image
+
+from filters.detector import (
+    TorchDetector,
+    OnnxDetector,
+    export_onnx,
+    detect_face,
+    MODEL_FACE_PATH,
+    MODEL_BODY_PATH,
+)
+from filters.body_frame import detect_body
+
+
+def iou(a, b):
+    if a is None or b is None:
+        return 1.0 if a is None and b is None else 0.0
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter + 1e-9)
+
+
+def time_backend(pick, model, images, runs):
+    picks = [pick(img, model) for img in images]  # warm-up + result
+    times = []
+    for _ in range(runs):
+        for img in images:
+            t0 = time.perf_counter()
+            pick(img, model)
+            times.append(time.perf_counter() - t0)
+    return picks, times
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("images", nargs="+")
+    ap.add_argument("--int8", action="store_true")
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    images = [Image.open(p).convert("RGB") for p in args.images]
+
+    cases = [
+        ("face", MODEL_FACE_PATH, lambda img, m: detect_face(img, model=m)),
+        ("body", MODEL_BODY_PATH, lambda img, m: detect_body(img, m)),
+    ]
+
+    for name, weights, pick in cases:
+        torch_model = TorchDetector(weights, threads=args.threads)
+        onnx_model = OnnxDetector(export_onnx(weights, int8=args.int8), threads=args.threads)
+
+        torch_picks, torch_times = time_backend(pick, torch_model, images, args.runs)
+        onnx_picks, onnx_times = time_backend(pick, onnx_model, images, args.runs)
+
+        ious = [iou(a, b) for a, b in zip(torch_picks, onnx_picks)]
+
+        print(f"== {name} ({os.path.basename(onnx_model.onnx_path)})")
+        print(f"  IoU vs torch: mean {np.mean(ious):.3f}  min {np.min(ious):.3f}")
+        for label, times in (("torch", torch_times), ("onnx", onnx_times)):
+            print(
+                f"  {label:<5} mean {statistics.mean(times) * 1000:7.1f}ms"
+                f"  median {statistics.median(times) * 1000:7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Per-stage memory gate for large inputs.
+
+    python bench_memory.py                       # check against memory_budgets.json
+    python bench_memory.py --sizes 12 48 100     # larger inputs (~75 s at 12 MP, ~10 min at 100 MP)
+    python bench_memory.py --update              # re-record budgets from this run
+
+Renders synthetic images (default 2 and 6 MP) through the full pipeline
+graph with stub detectors (fixed boxes, no model weights) and the local
+clothing backend (no network), profiling every stage, and every style step
+("style.<label>"), with StageMemoryProfile. Exits 1 if any of them peaks
+(RSS or traced Python) over its stored budget.
+tests/test_memory_budget.py runs the 2 MP check as part of the suite.
+"""
+import os
+import gc
+import sys
+import json
+import argparse
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+import filters.detector as detector
+import filters.pipeline as pipeline
+from filters.mem_profile import StageMemoryProfile
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_budgets.json")
+DEFAULT_SIZES = (2, 6)
+FIELDS = ("rss_peak", "py_peak")
+
+# budgets get this much headroom over the measured peak, and never go below FLOOR
+HEADROOM = 1.25
+FLOOR = 8 * 1024 * 1024
+
+
+class StubDetector:
+    """
+    Stands in for a detector backend: one fixed box, as a fraction of the
+    frame, in the (N, 6) [x1, y1, x2, y2, conf, cls] format.
+    """
+
+    def __init__(self, box, cls=0):
+        self.box = box
+        self.cls = cls
+
+    def __call__(self, img_np, imgsz=None):
+        h, w = img_np.shape[:2]
+        x1, y1, x2, y2 = self.box
+        return np.array([[x1 * w, y1 * h, x2 * w, y2 * h, 0.9, self.cls]], dtype=np.float32)
+
+    def __repr__(self):
+        return f"StubDetector({self.box})"
+
+
+def synthetic_image(megapixels, aspect=4 / 3):
+    h = int((megapixels * 1e6 / aspect) ** 0.5)
+    w = int(h * aspect)
+    x = np.linspace(0, 255, w, dtype=np.float32)
+    y = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+    arr = np.empty((h, w, 3), dtype=np.uint8)
+    arr[..., 0] = x
+    arr[..., 1] = y
+    arr[..., 2] = 96
+    # a "person": red top, dark bottom
+    arr[int(h * 0.30):int(h * 0.55), int(w * 0.40):int(w * 0.60)] = (200, 30, 30)
+    arr[int(h * 0.55):int(h * 0.90), int(w * 0.40):int(w * 0.60)] = (30, 30, 60)
+    return Image.fromarray(arr)
+
+
+STUB_FACE_BOX = (0.45, 0.12, 0.55, 0.26)
+STUB_BODY_BOX = (0.38, 0.10, 0.62, 0.92)
+
+
+def install_stubs():
+    detector.model_face = StubDetector(STUB_FACE_BOX)
+    pipeline.model_body = StubDetector(STUB_BODY_BOX)
+
+
+def profile_size(megapixels, workdir):
+    img = synthetic_image(megapixels)
+    path = os.path.join(workdir, f"synthetic_{megapixels}mp.png")  # output path only, never read
+    prof = StageMemoryProfile(trim=True)
+    pipeline.run_pipeline(path, image=img, memo=None, clothing_backend="local", variants=None,
+                          mem_profile=prof)
+    del img
+    gc.collect()
+    return prof
+
+
+def load_budgets(path=BUDGETS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def check(megapixels, prof, budgets):
+    failures = []
+    size_budgets = budgets.get(str(megapixels), {})
+    for stage, stats in prof.stages.items():
+        limits = size_budgets.get(stage)
+        if limits is None:
+            continue
+        for field in FIELDS:
+            if stats[field] > limits[field]:
+                failures.append(
+                    f"{megapixels}MP {stage}: {field} {stats[field] / 1e6:.1f}MB"
+                    f" > budget {limits[field] / 1e6:.1f}MB"
+                )
+    return failures
+
+
+def record(megapixels, prof, budgets):
+    budgets[str(megapixels)] = {
+        stage: {field: max(FLOOR, int(stats[field] * HEADROOM)) for field in FIELDS}
+        for stage, stats in prof.stages.items()
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="megapixels")
+    ap.add_argument("--budgets", default=BUDGETS_PATH)
+    ap.add_argument("--update", action="store_true", help="write measured peaks as the new budgets")
+    args = ap.parse_args(argv)
+
+    install_stubs()
+    budgets = load_budgets(args.budgets)
+    failures = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for mp in args.sizes:
+            prof = profile_size(mp, workdir)
+            print(f"== {mp} MP")
+            print(prof.report())
+            if args.update:
+                record(mp, prof, budgets)
+            else:
+                if str(mp) not in budgets:
+                    print(f"  (no budget recorded for {mp} MP)")
+                failures += check(mp, prof, budgets)
+
+    if args.update:
+        with open(args.budgets, "w") as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+        print(f"budgets written to {args.budgets}")
+        return 0
+
+    for line in failures:
+        print("OVER BUDGET", line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
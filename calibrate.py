@@ -0,0 +1,80 @@
+"""
+Calibrate worker processes, detector threads and stage threads for this host.
+
+    python calibrate.py                          # synthetic 2 MP workload
+    python calibrate.py --images a.jpg b.jpg     # your own photos (copied to a temp dir)
+    python calibrate.py --max-latency 3.0        # best throughput with p95 <= 3 s
+    python calibrate.py --show                   # print the active profile
+
+Every candidate configuration renders the same inputs in a fresh process
+pool (local clothing labels, no network). The one with the most images
+per second is written to the tuning profile, which batch (worker_pool)
+and service (watch_daemon.py) entry points load automatically.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from filters.tuning import (
+    TUNING_PROFILE,
+    load_profile,
+    save_profile,
+    candidate_configs,
+    synthetic_inputs,
+    calibrate,
+)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Calibrate worker/thread counts for this host.")
+    ap.add_argument("--images", nargs="*", help="inputs to use (default: synthetic)")
+    ap.add_argument("--count", type=int, default=8, help="synthetic images per config")
+    ap.add_argument("--megapixels", type=float, default=2.0, help="synthetic image size")
+    ap.add_argument("--max-latency", type=float, default=None, help="p95 seconds per image")
+    ap.add_argument("--profile", default=TUNING_PROFILE)
+    ap.add_argument("--show", action="store_true", help="print the active profile and exit")
+    args = ap.parse_args(argv)
+
+    if args.show:
+        print(json.dumps(load_profile(args.profile), indent=2))
+        return 0
+
+    configs = candidate_configs()
+    print(f"{len(configs)} configs on {os.cpu_count()} cores")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.images:
+            # renders are written next to their input; keep them out of the user's folders
+            paths = [shutil.copy(p, workdir) for p in args.images]
+        else:
+            paths = synthetic_inputs(workdir, args.count, args.megapixels)
+        best, _ = calibrate(paths, configs, max_latency=args.max_latency)
+
+    from filters.detector import DETECTOR_BACKEND
+
+    profile = {
+        "workers": best["workers"],
+        "detector_threads": best["detector_threads"],
+        "stage_workers": best["stage_workers"],
+        "images_per_sec": round(best["images_per_sec"], 3),
+        "p50_latency": round(best["p50_latency"], 3),
+        "p95_latency": round(best["p95_latency"], 3),
+        "cpu_count": os.cpu_count(),
+        "detector_backend": DETECTOR_BACKEND,
+        "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    save_profile(profile, args.profile)
+    print(f"best: {json.dumps(profile)}")
+    print(f"written to {args.profile}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,22 +4,22 @@ from filters.face_frame import _make_square_bbox, GREEN  # GREEN reused
 
 def detect_body(image_pil, yolo_model):
     """
-    Detect the largest person in the frame with a YOLO model (class 0 = person).
+    Detect the largest person in the frame with a YOLO detector (class 0 = person).
+    `yolo_model` is a backend from filters.detector.load_detector().
     Returns (x1, y1, x2, y2) or None.
     """
     import numpy as np
 
     img_np = np.array(image_pil)
-    results = yolo_model(img_np, verbose=False)
+    dets = yolo_model(img_np)
 
-    if not results or len(results[0].boxes) == 0:
+    if len(dets) == 0:
         return None
 
     persons = []
-    for box in results[0].boxes:
-        if int(box.cls[0]) != 0:
+    for x1, y1, x2, y2, _, cls in dets.tolist():
+        if int(cls) != 0:
             continue
-        x1, y1, x2, y2 = box.xyxy[0].tolist()
         area = (x2 - x1) * (y2 - y1)
         persons.append((area, (x1, y1, x2, y2)))
 
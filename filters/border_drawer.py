@@ -1,7 +1,29 @@
+from functools import lru_cache
+
 from PIL import Image, ImageDraw, ImageFont
 
-def draw_borders_and_labels(img):
+BORDER_COLOR = (255, 255, 255)
+
+
+def draw_borders_and_labels(img, mask=None):
+    """
+    Paint the white HUD borders + labels over `img`.
+    `mask` can be a mask prepared ahead of time with make_border_mask().
+    """
+    if mask is None:
+        mask = make_border_mask(img.size)
     out = img.copy()
+    out.paste(BORDER_COLOR, mask=mask)
+    return out
+
+
+@lru_cache(maxsize=4)
+def make_border_mask(size):
+    """
+    Coverage mask ("L") of the borders + labels for an image of `size`.
+    Depends only on the size, so it can be built before the image is ready.
+    """
+    out = Image.new("L", size, 0)
     draw = ImageDraw.Draw(out)
 
     # Text size helper for Pillow 10+
@@ -13,7 +35,7 @@ def draw_borders_and_labels(img):
     margin_x = w * 0.03
     margin_y = h * 0.03
     thick = 2 if min(w, h) >= 600 else 1
-    color = (255, 255, 255)
+    color = 255
 
     def I(x): return (int(x[0]), int(x[1]))
 
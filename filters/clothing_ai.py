@@ -1,7 +1,10 @@
 import os
 import io
 import json
+import time
 import base64
+import logging
+from PIL import Image
 from dotenv import load_dotenv
 from openai import OpenAI
 
@@ -18,6 +21,15 @@ if not api_key:
 
 client = OpenAI(api_key=api_key)
 
+log = logging.getLogger(__name__)
+
+# Request payload limits
+CLOTHING_MAX_SIDE = int(os.getenv("CLOTHING_MAX_SIDE", "768"))          # longest side sent, px
+CLOTHING_MAX_BYTES = int(os.getenv("CLOTHING_MAX_BYTES", "120000"))     # JPEG byte budget
+CLOTHING_IMAGE_DETAIL = os.getenv("CLOTHING_IMAGE_DETAIL", "auto")      # "low" | "high" | "auto"
+CLOTHING_MIN_SIDE = int(os.getenv("CLOTHING_MIN_SIDE", "128"))          # don't shrink below this to fit
+JPEG_QUALITIES = (85, 75, 65, 55, 45, 35)
+
 PROMPT = (
     "You are a fashion assistant. Look at the person in the image and "
     "describe concisely:\n"
@@ -27,26 +39,91 @@ PROMPT = (
     "{\"top\": \"red polo shirt\", \"bottom\": \"light denim shorts\"}"
 )
 
-def analyze_clothing_with_gpt(body_crop_pil):
-    # Convert crop to base64
+def _jpeg(img, quality):
     buf = io.BytesIO()
-    body_crop_pil.save(buf, format="JPEG")
-    b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def encode_crop(body_crop_pil, max_side=CLOTHING_MAX_SIDE, max_bytes=CLOTHING_MAX_BYTES,
+                min_side=CLOTHING_MIN_SIDE):
+    """
+    Downscale so the longest side is <= max_side, then pick the highest
+    JPEG quality that fits max_bytes. If even the lowest quality doesn't
+    fit, keep shrinking (not below min_side) at that quality; a payload
+    that still doesn't fit is sent anyway and logged.
+    Returns (jpeg_bytes, info_dict).
+    """
+    t0 = time.perf_counter()
+    img = body_crop_pil.convert("RGB")
+    orig_size = img.size
+
+    if max(img.size) > max_side:
+        img = img.copy()
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    for quality in JPEG_QUALITIES:
+        data = _jpeg(img, quality)
+        if len(data) <= max_bytes:
+            break
+
+    while len(data) > max_bytes and max(img.size) > min_side:
+        # JPEG size goes roughly with pixel count
+        scale = min(0.9, max(0.5, (max_bytes / len(data)) ** 0.5))
+        side = max(min_side, int(max(img.size) * scale))
+        img.thumbnail((side, side), Image.LANCZOS)
+        data = _jpeg(img, quality)
+
+    if len(data) > max_bytes:
+        log.warning(
+            "clothing crop over budget: %d B > %d B at %dx%d q%d",
+            len(data), max_bytes, *img.size, quality,
+        )
+
+    info = {
+        "orig_size": orig_size,
+        "sent_size": img.size,
+        "quality": quality,
+        "bytes": len(data),
+        "encode_ms": (time.perf_counter() - t0) * 1000,
+    }
+    return data, info
+
+
+def build_clothing_request(body_crop_pil, detail=CLOTHING_IMAGE_DETAIL, **encode_kwargs):
+    """
+    Chat-completions messages for the clothing prompt + payload info.
+    """
+    data, info = encode_crop(body_crop_pil, **encode_kwargs)
+    b64 = base64.b64encode(data).decode("utf-8")
+    info["payload_bytes"] = len(b64)
+
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": PROMPT},
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/jpeg;base64,{b64}", "detail": detail},
+                },
+            ],
+        }
+    ]
+    return messages, info
+
+
+def analyze_clothing_with_gpt(body_crop_pil):
+    messages, info = build_clothing_request(body_crop_pil)
+    log.info(
+        "clothing request: %dx%d -> %dx%d q%d, %d B jpeg / %d B base64, encode %.1f ms",
+        *info["orig_size"], *info["sent_size"], info["quality"],
+        info["bytes"], info["payload_bytes"], info["encode_ms"],
+    )
 
     response = client.chat.completions.create(
         model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": PROMPT},
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{b64}"},
-                    },
-                ],
-            }
-        ],
+        messages=messages,
     )
 
     raw = response.choices[0].message.content
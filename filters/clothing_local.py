@@ -0,0 +1,183 @@
+"""
+Offline clothing describer: dominant colours of the top / bottom half of
+the body crop, named, plus a garment type. CPU only, a few ms per image.
+
+    describe_clothing(body_crop) -> ("NAVY SHIRT", "BLACK PANTS")
+
+Garment types come from a cheap heuristic (skin below the waist -> shorts)
+unless CLOTHING_TYPE_MODEL points to a small ONNX image classifier
+(224x224 RGB, ImageNet normalisation, labels one per line in <model>.txt).
+
+CLOTHING_BACKEND picks the label source used by the pipeline:
+    gpt          remote call (default)
+    local        this module only, no network
+    placeholder  this module now; the GPT answer is fetched in the
+                 background and used once it arrives (needs a StageMemo)
+"""
+import os
+import colorsys
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+CLOTHING_BACKEND = os.getenv("CLOTHING_BACKEND", "gpt")
+CLOTHING_TYPE_MODEL = os.getenv("CLOTHING_TYPE_MODEL", "")
+
+ANALYSIS_SIDE = 96  # crop is shrunk to this before anything else
+
+# regions of the padded body crop (fractions of height / width)
+TOP_ROWS = (0.18, 0.50)
+BOTTOM_ROWS = (0.52, 0.88)
+CENTER_COLS = (0.30, 0.70)  # torso/legs, away from the background
+
+KMEANS_K = 3
+KMEANS_ITERS = 8
+
+
+# ---- colour ----
+def _skin_mask(rgb):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    cr = 128 + 0.5 * r - 0.418688 * g - 0.081312 * b
+    cb = 128 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    return (cr >= 133) & (cr <= 173) & (cb >= 77) & (cb <= 127)
+
+
+def kmeans_dominant(pixels, k=KMEANS_K, iters=KMEANS_ITERS):
+    """
+    Centre of the largest cluster of (N, 3) float pixels.
+    Deterministic: seeded from luminance quantiles.
+    """
+    if len(pixels) <= k:
+        return pixels.mean(axis=0)
+
+    luma = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    order = np.argsort(luma)
+    centers = pixels[order[(np.arange(k) * 2 + 1) * len(pixels) // (2 * k)]].copy()
+
+    for _ in range(iters):
+        dist = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        assign = dist.argmin(axis=1)
+        for i in range(k):
+            members = pixels[assign == i]
+            if len(members):
+                centers[i] = members.mean(axis=0)
+
+    counts = np.bincount(assign, minlength=k)
+    return centers[counts.argmax()]
+
+
+def color_name(rgb):
+    r, g, b = (float(c) / 255.0 for c in rgb)
+    h, s, v = colorsys.rgb_to_hsv(r, g, b)
+    hue = h * 360.0
+
+    if v < 0.18:
+        return "BLACK"
+    if s < 0.15:
+        if v > 0.85:
+            return "WHITE"
+        if v > 0.6:
+            return "LIGHT GRAY"
+        return "GRAY" if v > 0.35 else "DARK GRAY"
+    if s < 0.35 and 20 <= hue < 55 and v > 0.6:
+        return "BEIGE"
+
+    if hue < 15 or hue >= 345:
+        name = "RED"
+    elif hue < 40:
+        name = "BROWN" if v < 0.6 else "ORANGE"
+    elif hue < 65:
+        name = "OLIVE" if v < 0.5 else "YELLOW"
+    elif hue < 160:
+        name = "GREEN"
+    elif hue < 195:
+        name = "TEAL"
+    elif hue < 255:
+        name = "NAVY" if v < 0.4 else "BLUE"
+    elif hue < 290:
+        name = "PURPLE"
+    else:
+        name = "PINK"
+
+    if name in ("BROWN", "OLIVE", "NAVY"):
+        return name
+    if v < 0.4:
+        return "DARK " + name
+    if v > 0.85 and s < 0.45:
+        return "LIGHT " + name
+    return name
+
+
+# ---- garment type ----
+@lru_cache(maxsize=1)
+def _type_classifier():
+    if not CLOTHING_TYPE_MODEL:
+        return None
+    import onnxruntime as ort
+
+    sess = ort.InferenceSession(CLOTHING_TYPE_MODEL, providers=["CPUExecutionProvider"])
+    labels_path = os.path.splitext(CLOTHING_TYPE_MODEL)[0] + ".txt"
+    with open(labels_path) as f:
+        labels = [line.strip().upper() for line in f if line.strip()]
+    return sess, labels
+
+
+def _classify(region_pil):
+    sess, labels = _type_classifier()
+    x = np.asarray(region_pil.resize((224, 224), Image.BILINEAR), dtype=np.float32) / 255.0
+    x = (x - np.array([0.485, 0.456, 0.406], dtype=np.float32)) / np.array([0.229, 0.224, 0.225], dtype=np.float32)
+    x = x.transpose(2, 0, 1)[None]
+    logits = sess.run(None, {sess.get_inputs()[0].name: x})[0][0]
+    return labels[int(np.argmax(logits))]
+
+
+def _region(arr, rows, cols):
+    h, w = arr.shape[:2]
+    y0, x0 = min(int(h * rows[0]), h - 1), min(int(w * cols[0]), w - 1)
+    return arr[y0:max(int(h * rows[1]), y0 + 1), x0:max(int(w * cols[1]), x0 + 1)]
+
+
+def _dominant(region):
+    """
+    (dominant colour, skin fraction) of a region. Skin pixels (arms, neck,
+    legs) are left out unless they are most of it: tan / brown fabric
+    falls in the same chroma range as skin.
+    """
+    pixels = region.reshape(-1, 3).astype(np.float32)
+    skin = _skin_mask(pixels)
+    skin_frac = float(skin.mean()) if len(skin) else 0.0
+    cloth = pixels[~skin] if skin_frac < 0.6 and (~skin).sum() >= 16 else pixels
+    return kmeans_dominant(cloth), skin_frac
+
+
+def describe_clothing(body_crop_pil):
+    """
+    (top, bottom) descriptions, upper-case like the GPT backend.
+    Pass a crop of the original photo, not the stylized image.
+    """
+    rgb = body_crop_pil.convert("RGB")
+    img = rgb.copy()
+    if max(img.size) > ANALYSIS_SIDE:
+        img.thumbnail((ANALYSIS_SIDE, ANALYSIS_SIDE), Image.BILINEAR)
+    arr = np.asarray(img)
+
+    top_rgb, _ = _dominant(_region(arr, TOP_ROWS, CENTER_COLS))
+
+    # hips / thighs are fabric for both pants and shorts; the lower half may be bare legs
+    bottom = _region(arr, BOTTOM_ROWS, CENTER_COLS)
+    half = max(1, bottom.shape[0] // 2)
+    bottom_rgb, _ = _dominant(bottom[:half])
+    legs_rgb, legs_skin = _dominant(bottom[half:]) if bottom.shape[0] > 1 else (bottom_rgb, 0.0)
+
+    if _type_classifier() is not None:
+        w, h = rgb.size
+        top_type = _classify(rgb.crop((0, int(h * TOP_ROWS[0]), w, int(h * TOP_ROWS[1]))))
+        bottom_type = _classify(rgb.crop((0, int(h * BOTTOM_ROWS[0]), w, int(h * BOTTOM_ROWS[1]))))
+    else:
+        # skin-coloured legs that differ from the fabric above them -> shorts
+        bare_legs = legs_skin > 0.35 and float(np.abs(legs_rgb - bottom_rgb).sum()) > 60
+        top_type = "SHIRT"
+        bottom_type = "SHORTS" if bare_legs else "PANTS"
+
+    return f"{color_name(top_rgb)} {top_type}", f"{color_name(bottom_rgb)} {bottom_type}"
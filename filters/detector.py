@@ -1,31 +1,343 @@
-from ultralytics import YOLO
+import os
+import ast
+import threading
 import numpy as np
 
+from filters.tuning import load_profile
+
+# Backend: "torch" (ultralytics eager) or "onnx" (onnxruntime CPU)
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "torch")
+# intra-op threads per detector; 0 = library default. Falls back to the tuning profile.
+DETECTOR_THREADS = int(os.getenv("DETECTOR_THREADS", str(load_profile()["detector_threads"])))
+DETECTOR_INT8 = os.getenv("DETECTOR_INT8", "0") == "1"
+
+# Cascade: look for the face in the upper part of the body box first
+FACE_CASCADE = os.getenv("FACE_CASCADE", "0") == "1"
+FACE_CASCADE_UPPER = 0.45   # fraction of the padded body box height searched
+# model input size for the cascade crop (the crop is small, 640 is wasted on it)
+FACE_CASCADE_IMGSZ = int(os.getenv("FACE_CASCADE_IMGSZ", "320"))
+
 # Face model
 MODEL_FACE_PATH = "models/yolov8n-face.pt"
-model_face = YOLO(MODEL_FACE_PATH)
 
 # Body model (COCO detector)
 MODEL_BODY_PATH = "models/yolo11n.pt"
-model_body = YOLO(MODEL_BODY_PATH)
 
 
 # MODEL_FACE_PATH = "models/yolo11n-face.pt"
-# model_face = YOLO(MODEL_FACE_PATH)   
 
-def detect_face(image_pil):
+
+# Every backend is called with an RGB uint8 array (and optionally imgsz,
+# the model input side; default 640) and returns an (N, 6) float array of
+# [x1, y1, x2, y2, conf, cls] in image pixels.
+
+class TorchDetector:
+    def __init__(self, weights_path, threads=DETECTOR_THREADS):
+        from ultralytics import YOLO
+
+        self.weights_path = weights_path
+        self.model = YOLO(weights_path)
+        self.set_threads(threads)
+
+    def set_threads(self, threads):
+        # torch's intra-op pool is per process, shared by both models
+        self.threads = threads
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+
+    def __repr__(self):
+        return f"TorchDetector({self.weights_path!r})"
+
+    def __call__(self, img_np, imgsz=None):
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        # ultralytics takes numpy input as BGR (cv2 order) and flips it itself
+        bgr = np.ascontiguousarray(img_np[..., ::-1])
+        results = self.model(bgr, verbose=False, **kwargs)
+        if not results or len(results[0].boxes) == 0:
+            return np.zeros((0, 6), dtype=np.float32)
+
+        boxes = results[0].boxes
+        return np.concatenate(
+            [
+                boxes.xyxy.cpu().numpy(),
+                boxes.conf.cpu().numpy()[:, None],
+                boxes.cls.cpu().numpy()[:, None],
+            ],
+            axis=1,
+        ).astype(np.float32)
+
+
+class OnnxDetector:
+    """
+    YOLOv8/11 ONNX export run with onnxruntime on CPU.
+    Pre/postprocessing (letterbox, NMS) mirrors ultralytics defaults.
+    """
+
+    def __init__(self, onnx_path, threads=DETECTOR_THREADS, conf=0.25, iou=0.7, max_det=300):
+        self.onnx_path = onnx_path
+        self.set_threads(threads)
+        self.input_name = self.session.get_inputs()[0].name
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+        # ultralytics stores names / imgsz in the ONNX metadata
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.imgsz = tuple(ast.literal_eval(meta["imgsz"])) if "imgsz" in meta else (640, 640)
+        self.nc = len(ast.literal_eval(meta["names"])) if "names" in meta else None
+        # a static export only takes its own input size
+        self.dynamic = not all(isinstance(d, int) for d in self.session.get_inputs()[0].shape[2:])
+
+    def __repr__(self):
+        return f"OnnxDetector({self.onnx_path!r}, conf={self.conf}, iou={self.iou})"
+
+    def set_threads(self, threads):
+        # onnxruntime fixes the thread pool at session creation
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            self.onnx_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self.threads = threads
+
+    def _letterbox(self, img_np, imgsz=None):
+        import cv2  # installed with ultralytics, which the export needs anyway
+
+        h, w = img_np.shape[:2]
+        new_h, new_w = (imgsz, imgsz) if imgsz and self.dynamic else self.imgsz
+        r = min(new_h / h, new_w / w)
+        nw, nh = int(round(w * r)), int(round(h * r))
+
+        left = int(round((new_w - nw) / 2 - 0.1))
+        top = int(round((new_h - nh) / 2 - 0.1))
+
+        canvas = np.full((new_h, new_w, 3), 114, dtype=np.uint8)
+        # same resize as ultralytics' LetterBox (no antialiasing, unlike PIL's BILINEAR)
+        resized = img_np if (nw, nh) == (w, h) else cv2.resize(img_np, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        canvas[top:top + nh, left:left + nw] = resized
+
+        # RGB, which is what ultralytics feeds the model after its own BGR flip
+        blob = canvas.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        return blob, r, left, top
+
+    def __call__(self, img_np, imgsz=None):
+        h, w = img_np.shape[:2]
+        blob, r, left, top = self._letterbox(img_np, imgsz)
+        out = self.session.run(None, {self.input_name: blob})[0][0]  # (4 + nc [+ kpts], anchors)
+
+        nc = self.nc if self.nc is not None else out.shape[0] - 4
+        preds = out.T
+        scores = preds[:, 4:4 + nc]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+
+        keep = conf > self.conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+
+        cx, cy, bw, bh = preds[keep, :4].T
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+        conf, cls = conf[keep], cls[keep]
+
+        idx = nms(boxes, conf, cls, self.iou)[: self.max_det]
+        boxes, conf, cls = boxes[idx], conf[idx], cls[idx]
+
+        # undo letterbox
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - left) / r).clip(0, w)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - top) / r).clip(0, h)
+
+        return np.concatenate(
+            [boxes, conf[:, None], cls[:, None].astype(np.float32)], axis=1
+        ).astype(np.float32)
+
+
+def nms(boxes, scores, classes, iou_thresh):
+    """
+    Greedy class-aware NMS. Returns kept indices sorted by score.
+    """
+    # offset boxes per class so different classes never overlap
+    offset = classes[:, None].astype(np.float32) * 7680.0
+    b = boxes + offset
+    areas = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        xx1 = np.maximum(b[i, 0], b[rest, 0])
+        yy1 = np.maximum(b[i, 1], b[rest, 1])
+        xx2 = np.minimum(b[i, 2], b[rest, 2])
+        yy2 = np.minimum(b[i, 3], b[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[iou <= iou_thresh]
+
+    return np.array(keep, dtype=np.int64)
+
+
+#  ONNX export / quantization
+def onnx_path_for(weights_path, int8=False):
+    base, _ = os.path.splitext(weights_path)
+    return base + ("-int8.onnx" if int8 else ".onnx")
+
+
+def export_onnx(weights_path, int8=False, imgsz=640):
+    """
+    Export ultralytics weights to ONNX (next to the .pt file),
+    optionally followed by dynamic INT8 weight quantization.
+    Returns the .onnx path.
+    """
+    fp32_path = onnx_path_for(weights_path)
+    if not os.path.exists(fp32_path):
+        from ultralytics import YOLO
+
+        exported = YOLO(weights_path).export(format="onnx", imgsz=imgsz, simplify=True)
+        if os.path.abspath(exported) != os.path.abspath(fp32_path):
+            os.replace(exported, fp32_path)
+
+    if not int8:
+        return fp32_path
+
+    int8_path = onnx_path_for(weights_path, int8=True)
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def load_detector(weights_path, backend=DETECTOR_BACKEND, threads=DETECTOR_THREADS, int8=DETECTOR_INT8):
+    if backend == "torch":
+        return TorchDetector(weights_path, threads=threads)
+    if backend == "onnx":
+        return OnnxDetector(export_onnx(weights_path, int8=int8), threads=threads)
+    raise ValueError(f"Unknown detector backend: {backend}")
+
+
+class LazyDetector:
+    """
+    Loads its backend on first call, so importing this module (bench
+    scripts, CI, the GUI at startup) doesn't read any weights.
+    The repr names backend and weights without loading; it goes into cache keys.
+    """
+
+    def __init__(self, weights_path, backend=DETECTOR_BACKEND, int8=DETECTOR_INT8):
+        self.weights_path = weights_path
+        self.backend = backend
+        self.int8 = int8
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_detector(
+                        self.weights_path, backend=self.backend, threads=DETECTOR_THREADS, int8=self.int8
+                    )
+        return self._model
+
+    def set_threads(self, threads):
+        if self._model is not None:
+            self._model.set_threads(threads)
+
+    def __repr__(self):
+        int8 = ", int8" if self.backend == "onnx" and self.int8 else ""
+        return f"LazyDetector({self.weights_path!r}, {self.backend}{int8})"
+
+    def __call__(self, img_np, imgsz=None):
+        return self.load()(img_np, imgsz)
+
+
+model_face = LazyDetector(MODEL_FACE_PATH)
+model_body = LazyDetector(MODEL_BODY_PATH)
+
+
+def preload_detectors():
+    """
+    Load both models now (the worker forkserver does this once, so forked
+    workers share them).
+    """
+    for model in (model_face, model_body):
+        model.load()
+
+
+def set_detector_threads(threads):
+    """
+    Change the thread count of the models in place
+    (e.g. in a pool worker forked from a preloaded server).
+    """
+    global DETECTOR_THREADS
+    if threads == DETECTOR_THREADS:
+        return
+    DETECTOR_THREADS = threads
+    for model in (model_face, model_body):
+        model.set_threads(threads)
+
+
+def detect_face(image_pil, model=None, imgsz=None):
+    model = model or model_face
     img_np = np.array(image_pil)
-    results = model_face(img_np, verbose=False)
+    dets = model(img_np) if imgsz is None else model(img_np, imgsz)
 
-    if not results or len(results[0].boxes) == 0:
+    if len(dets) == 0:
         return None  # no face detected
 
     # pick largest face
     faces = []
-    for box in results[0].boxes.xyxy:
-        x1, y1, x2, y2 = box.tolist()
+    for x1, y1, x2, y2, _, _ in dets.tolist():
         area = (x2-x1) * (y2-y1)
         faces.append((area, (x1,y1,x2,y2)))
 
     _, face_box = max(faces, key=lambda x: x[0])
     return face_box
+
+
+#  CASCADE (face search inside the body box, full-frame fallback)
+def detect_face_cascade(image_pil, body_bbox, upper_ratio=FACE_CASCADE_UPPER, model=None,
+                        imgsz=FACE_CASCADE_IMGSZ, stats=None):
+    """
+    Run the face model (at input size `imgsz`) only on the upper part of the
+    padded body box and map the result back to image coordinates. Falls back
+    to detect_face() on the whole frame when there's no body or no face in
+    the region. `stats` ({"runs", "fallbacks"}, one per render) is updated.
+    """
+    from filters.body_frame import _make_body_bbox
+
+    if stats is not None:
+        stats["runs"] += 1
+
+    if body_bbox is not None:
+        w, h = image_pil.size
+        bx1, by1, bx2, by2 = _make_body_bbox(*body_bbox, w, h, pad_ratio=0.10)
+        cy2 = by1 + int((by2 - by1) * upper_ratio)
+
+        if bx2 - bx1 >= 16 and cy2 - by1 >= 16:
+            face = detect_face(image_pil.crop((bx1, by1, bx2, cy2)), model=model, imgsz=imgsz)
+            if face is not None:
+                x1, y1, x2, y2 = face
+                return (x1 + bx1, y1 + by1, x2 + bx1, y2 + by1)
+
+    if stats is not None:
+        stats["fallbacks"] += 1
+    return detect_face(image_pil, model=model)
+
+
+def add_cascade_stats(total, stats):
+    """
+    Add one render's {"runs", "fallbacks"} into `total` (e.g. across a batch).
+    """
+    for k in ("runs", "fallbacks"):
+        total[k] = total.get(k, 0) + stats.get(k, 0)
+    total["fallback_rate"] = round(total["fallbacks"] / total["runs"], 3) if total["runs"] else 0.0
+    return total
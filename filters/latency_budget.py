@@ -0,0 +1,180 @@
+"""
+Latency-budget planning: pick the cheapest set of degradations that
+brings the estimated per-image time under a deadline.
+
+Costs come from a StageCostModel (EWMA of measured stage times, mostly
+normalised per megapixel). It starts from rough priors and is updated
+after every run, or can be built with fixed costs for tests/benchmarks.
+"""
+import threading
+
+# seconds per megapixel unless noted
+DEFAULT_COSTS = {
+    "load": 0.03,
+    "style.tint": 0.005,
+    "style.tint+contrast": 0.01,
+    "style.vignette": 0.5,
+    "style.noise": 0.02,
+    "style.contrast": 0.01,
+    "style.blur": 0.03,
+    "style.unsharp": 0.04,
+    "detect": 0.05,          # per MP of detector input (see DETECT_FLOOR_MP)
+    "clothing": 2.0,         # seconds, network round trip
+    "compose": 0.02,
+    "final": 0.01,
+    "encode": 0.2,
+    "encode_fast": 0.06,
+}
+
+# the detector letterboxes to 640px anyway; below this the cost stops shrinking
+DETECT_FLOOR_MP = 0.4
+
+# degradations in the order they are applied (least visible first)
+LADDER = [
+    "fast_encode",
+    "cached_labels",
+    "detect_1280",
+    "skip_noise",
+    "skip_sharpen",
+    "detect_640",
+]
+
+DEFAULT_LABELS = ("TOP: AI GENERATED TEXT", "BOTTOM: AI GENERATED TEXT")
+
+
+class BudgetPlan:
+    """
+    What the pipeline should do for one image.
+    """
+
+    def __init__(self, degradations=()):
+        self.degradations = list(degradations)
+        self.estimate = None
+
+    @property
+    def fast_encode(self):
+        return "fast_encode" in self.degradations
+
+    @property
+    def cached_labels(self):
+        return "cached_labels" in self.degradations
+
+    @property
+    def detect_max_side(self):
+        if "detect_640" in self.degradations:
+            return 640
+        if "detect_1280" in self.degradations:
+            return 1280
+        return None
+
+    @property
+    def skip_ops(self):
+        skip = []
+        if "skip_noise" in self.degradations:
+            skip.append("noise")
+        if "skip_sharpen" in self.degradations:
+            skip += ["blur", "unsharp"]
+        return tuple(skip)
+
+    def describe(self):
+        return ",".join(self.degradations) if self.degradations else "none"
+
+    def __repr__(self):
+        return f"BudgetPlan({self.describe()}, estimate={self.estimate})"
+
+
+class StageCostModel:
+    def __init__(self, costs=None, alpha=0.3):
+        self.costs = dict(DEFAULT_COSTS)
+        if costs:
+            self.costs.update(costs)
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, mp=None):
+        value = seconds / mp if mp else seconds
+        with self._lock:
+            old = self.costs.get(name)
+            self.costs[name] = value if old is None else old + self.alpha * (value - old)
+
+    def observe_run(self, run, plan, style_timings=None, clothing_backend="gpt"):
+        """
+        Update from a finished StageRun (see filters.pipeline.run_pipeline).
+        """
+        dur = run.durations()
+        w, h = run.results["load"].size
+        mp = w * h / 1e6
+
+        self.observe("load", dur["load"], mp)
+        for op, seconds in (style_timings or {}).items():
+            self.observe(f"style.{op}", seconds, mp)
+
+        det_mp = _detect_mp(mp, w, h, plan.detect_max_side)
+        # span of both detectors: they overlap normally, run back to back in cascade mode
+        det = [run.timings["face_bbox"], run.timings["body_bbox"]]
+        det_span = max(end for _, end in det) - min(start for start, _ in det)
+        self.observe("detect", det_span, det_mp)
+        if clothing_backend == "gpt" and not plan.cached_labels and run.results.get("clothing") is not None:
+            self.observe("clothing", dur["clothing"])
+        self.observe("compose", dur["compose"], mp)
+        self.observe("final", dur["final"], mp)
+        self.observe("encode_fast" if plan.fast_encode else "encode", dur["save"], mp)
+
+    def estimate(self, plan, size, style_ops=("tint+contrast", "vignette", "noise", "blur", "unsharp"),
+                 clothing_backend="gpt"):
+        """
+        Estimated seconds along the critical path
+        (load -> style -> detect -> clothing -> compose -> final -> save).
+        The local clothing estimator takes milliseconds and is counted as 0.
+        """
+        c = self.costs
+        w, h = size
+        mp = w * h / 1e6
+
+        style = sum(c.get(f"style.{op}", 0.0) for op in style_ops if op not in plan.skip_ops)
+        detect = c["detect"] * _detect_mp(mp, w, h, plan.detect_max_side)
+        clothing = 0.0 if plan.cached_labels or clothing_backend != "gpt" else c["clothing"]
+        encode = c["encode_fast"] if plan.fast_encode else c["encode"]
+
+        return (
+            c["load"] * mp
+            + style * mp
+            + detect
+            + clothing
+            + (c["compose"] + c["final"] + encode) * mp
+        )
+
+
+def _detect_mp(mp, w, h, max_side):
+    if max_side and max(w, h) > max_side:
+        scale = max_side / max(w, h)
+        mp = mp * scale * scale
+    return max(mp, DETECT_FLOOR_MP)
+
+
+def plan_for_budget(budget, size, cost_model, style_ops=None, clothing_backend="gpt"):
+    """
+    Walk down LADDER until the estimate fits `budget` seconds
+    (or everything is degraded). Steps that don't lower the estimate
+    (e.g. cached_labels with a local clothing backend, detect_1280 on a
+    small image) are skipped. budget=None -> full quality.
+    """
+    kwargs = {"clothing_backend": clothing_backend}
+    if style_ops:
+        kwargs["style_ops"] = style_ops
+    plan = BudgetPlan()
+    plan.estimate = cost_model.estimate(plan, size, **kwargs)
+    if budget is None:
+        return plan
+
+    for step in LADDER:
+        if plan.estimate <= budget:
+            break
+        candidate = BudgetPlan(plan.degradations + [step])
+        candidate.estimate = cost_model.estimate(candidate, size, **kwargs)
+        if candidate.estimate < plan.estimate:
+            plan = candidate
+    return plan
+
+
+default_cost_model = StageCostModel()
@@ -0,0 +1,178 @@
+"""
+Opt-in per-stage memory accounting for the pipeline graph.
+
+    prof = StageMemoryProfile()
+    apply_filters_sequence(path, mem_profile=prof)    # or MEM_PROFILE=1
+    print(prof.report())
+
+For every stage it records:
+    py_peak    tracemalloc peak above the level at stage start
+               (numpy buffers are traced, Pillow's image memory is not)
+    rss_peak   highest RSS seen while the stage ran, minus RSS at its start
+    rss_delta  RSS after the stage minus RSS before (what it kept)
+RSS is sampled every few ms on a background thread. Stages are run
+sequentially while profiling, otherwise the numbers of overlapping stages
+would be mixed together. trim=True returns freed heap to the OS before
+each stage (glibc malloc_trim), so RSS growth isn't hidden by memory the
+allocator kept from earlier stages.
+
+Steps inside a stage can be measured too (apply_preset records its steps
+as "style.<label>"); a nested measurement still counts towards the peak
+of the stage around it.
+"""
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import resource
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+MEM_PROFILE = os.getenv("MEM_PROFILE", "0") == "1"
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        # no /proc: lifetime high-water mark is the best we have
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _malloc_trim():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        libc.malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # not glibc
+
+
+class _RssSampler:
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self._peak = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="rss-sampler")
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = rss_bytes()
+            with self._lock:
+                self._peak = max(self._peak, rss)
+
+    def reset(self):
+        rss = rss_bytes()
+        with self._lock:
+            self._peak = rss
+        return rss
+
+    def peak(self):
+        rss = rss_bytes()
+        with self._lock:
+            return max(self._peak, rss)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class StageMemoryProfile:
+    def __init__(self, trim=False):
+        self.trim = trim
+        self.stages = {}  # name -> {"py_peak", "rss_peak", "rss_delta", "seconds"}
+        self._sampler = None
+        self._started_tracing = False
+        self._open = []  # absolute peaks seen by steps nested in each open measurement
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self._sampler is None:
+            self._sampler = _RssSampler()
+
+    def stop(self):
+        if self._sampler is not None:
+            self._sampler.close()
+            self._sampler = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def instrument(self, graph):
+        for stage in graph.order():
+            stage.fn = self._wrap(stage.name, stage.fn)
+        return graph
+
+    def _wrap(self, name, fn):
+        def wrapped(*args):
+            with self.measure(name):
+                return fn(*args)
+
+        return wrapped
+
+    def _fold(self):
+        # peaks so far belong to the enclosing measurement before they're reset
+        if self._open:
+            _, py_peak = tracemalloc.get_traced_memory()
+            outer = self._open[-1]
+            outer["py"] = max(outer["py"], py_peak)
+            outer["rss"] = max(outer["rss"], self._sampler.peak())
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Record the block as stage `name` (between start() and stop()).
+        """
+        self._fold()
+        if self.trim:
+            _malloc_trim()
+        tracemalloc.reset_peak()
+        py_base, _ = tracemalloc.get_traced_memory()
+        rss0 = self._sampler.reset()
+        inner = {"py": 0, "rss": 0}
+        self._open.append(inner)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._open.pop()
+            _, py_peak = tracemalloc.get_traced_memory()
+            py_peak = max(py_peak, inner["py"])
+            rss_peak = max(self._sampler.peak(), inner["rss"])
+            self.stages[name] = {
+                "py_peak": max(0, py_peak - py_base),
+                "rss_peak": max(0, rss_peak - rss0),
+                "rss_delta": rss_bytes() - rss0,
+                "seconds": time.perf_counter() - t0,
+            }
+            if self._open:
+                outer = self._open[-1]
+                outer["py"] = max(outer["py"], py_peak)
+                outer["rss"] = max(outer["rss"], rss_peak)
+
+    def worst(self, field="rss_peak"):
+        if not self.stages:
+            return None, 0
+        name = max(self.stages, key=lambda n: self.stages[n][field])
+        return name, self.stages[name][field]
+
+    def report(self):
+        lines = ["stage                 py_peak   rss_peak  rss_delta"]
+        for name, s in self.stages.items():
+            lines.append(
+                f"{name:<20} {s['py_peak'] / 1e6:7.1f}MB {s['rss_peak'] / 1e6:7.1f}MB"
+                f" {s['rss_delta'] / 1e6:8.1f}MB"
+            )
+        name, peak = self.worst()
+        if name is not None:
+            lines.append(f"largest stage peak: {name} ({peak / 1e6:.1f}MB RSS)")
+        return "\n".join(lines)
@@ -0,0 +1,88 @@
+"""
+Extra output sizes rendered from the same pipeline run.
+
+    OUTPUT_VARIANTS="web=1080:jpg:90,thumb=320:jpg:85"
+
+Each variant is name=max_side:format[:quality]. Files are written next to
+the full-size output as <base>_<name>_filtered.<ext>.
+
+Smaller levels are downscaled from the next larger one (a pyramid built
+from the composite *before* borders), then the HUD borders and labels are
+drawn at the target size so 1 px lines and small text stay sharp instead
+of being averaged away by the resize.
+"""
+import os
+from collections import namedtuple
+
+from PIL import Image
+
+from filters.border_drawer import draw_borders_and_labels, make_border_mask
+
+OUTPUT_VARIANTS = os.getenv("OUTPUT_VARIANTS", "")
+
+Variant = namedtuple("Variant", "name max_side format quality")
+
+_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+
+def parse_variants(spec):
+    """
+    "web=1080:jpg:90,thumb=320:webp" -> [Variant, ...], largest first.
+    """
+    if not spec:
+        return []
+    if isinstance(spec, (list, tuple)):
+        return sorted(spec, key=lambda v: -v.max_side)
+
+    variants = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, rest = item.partition("=")
+        parts = rest.split(":")
+        if not name or not parts[0]:
+            raise ValueError(f"bad output variant {item!r}, expected name=max_side:format[:quality]")
+        fmt = parts[1].lower() if len(parts) > 1 else "jpg"
+        if fmt not in _FORMATS:
+            raise ValueError(f"unknown format {fmt!r} for output variant {name!r}")
+        quality = int(parts[2]) if len(parts) > 2 else 90
+        variants.append(Variant(name, int(parts[0]), fmt, quality))
+    return sorted(variants, key=lambda v: -v.max_side)
+
+
+def variant_path(src_path, variant):
+    base, _ = os.path.splitext(src_path)
+    return f"{base}_{variant.name}_filtered.{variant.format}"
+
+
+def target_size(size, max_side):
+    w, h = size
+    if max(w, h) <= max_side:
+        return size
+    scale = max_side / max(w, h)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def downscale(img, max_side):
+    size = target_size(img.size, max_side)
+    if size == img.size:
+        return img
+    return img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+
+def save_variant(img, src_path, variant):
+    """
+    Borders at this size + encode. `img` is the downscaled composite.
+    """
+    img = draw_borders_and_labels(img, mask=make_border_mask(img.size))
+    out_path = variant_path(src_path, variant)
+    if os.path.exists(out_path):
+        os.remove(out_path)
+
+    fmt = _FORMATS[variant.format]
+    if fmt == "PNG":
+        img.save(out_path, format=fmt, compress_level=6)
+    else:
+        img.save(out_path, format=fmt, quality=variant.quality)
+    return out_path
@@ -1,12 +1,28 @@
 import os
+import time
+import hashlib
+import threading
+import importlib.util
+from functools import lru_cache
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from PIL import Image, ImageDraw
-
-from filters.stylistic_filters import apply_stylistic_pipeline
-from filters.border_drawer import draw_borders_and_labels
-
-from filters.detector import detect_face, model_body
+from PIL.PngImagePlugin import PngInfo
+
+from filters.stylistic_filters import apply_stylistic_pipeline, NOISE_SEED
+from filters.style_presets import DEFAULT_PRESET, get_preset, preset_step_labels
+from filters.border_drawer import draw_borders_and_labels, make_border_mask
+from filters.stage_graph import StageGraph
+
+from filters.detector import (
+    detect_face,
+    detect_face_cascade,
+    model_body,
+    model_face,
+    FACE_CASCADE,
+    FACE_CASCADE_IMGSZ,
+)
 from filters.face_frame import (
     draw_face_box,
     extract_face_crop,
@@ -18,43 +34,139 @@ from filters.body_frame import (
     draw_body_box,
     _make_body_bbox,
 )
-from filters.clothing_ai import analyze_clothing_with_gpt
+from filters.clothing_local import describe_clothing, CLOTHING_BACKEND
+from filters.result_cache import make_key
+from filters.output_variants import OUTPUT_VARIANTS, parse_variants, downscale, save_variant
+from filters.preview import PreviewPublisher
+from filters.mem_profile import StageMemoryProfile, MEM_PROFILE
+from filters.tuning import load_profile
+from filters.latency_budget import (
+    BudgetPlan,
+    plan_for_budget,
+    default_cost_model,
+    DEFAULT_LABELS,
+)
 
+# Bump when the output changes for a reason that isn't in RENDER_MODULES
+# (e.g. retrained weights under the same file name); code changes there are
+# picked up by render_code_fingerprint().
+PIPELINE_VERSION = "3"
+
+# Modules whose code decides the rendered pixels or labels
+RENDER_MODULES = (
+    "filters.pipeline",
+    "filters.stylistic_filters",
+    "filters.style_presets",
+    "filters.border_drawer",
+    "filters.detector",
+    "filters.face_frame",
+    "filters.face_card",
+    "filters.body_frame",
+    "filters.clothing_local",
+    "filters.clothing_ai",
+    "filters.latency_budget",
+)
 
-#  AI OVERLAY (face HUD + body HUD + GPT clothing labels)
-def apply_ai_overlay(image_pil, labels_offset_y=None):
-    """
-    Detects face + body, draws HUD boxes,
-    generates clothing labels using GPT Vision.
+# StageGraph threads per render (see filters.tuning)
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", str(load_profile()["stage_workers"])))
 
-    Returns:
-        main_image_with_all_huds, face_frame_bbox
-    """
 
-    face_bbox = detect_face(image_pil)
-    body_bbox = detect_body(image_pil, model_body)
+#  CLOTHING LABELS (GPT Vision on padded body crop)
+def _clothing_labels(image_pil, body_bbox, backend="gpt"):
+    if not body_bbox:
+        return None
 
-    out = image_pil.copy()
-    face_frame_bbox = None
+    w, h = image_pil.size
+    bx1, by1, bx2, by2 = _make_body_bbox(
+        body_bbox[0], body_bbox[1], body_bbox[2], body_bbox[3],
+        w, h, pad_ratio=0.10
+    )
+
+    body_crop = image_pil.crop((bx1, by1, bx2, by2))
+
+    try:
+        if backend == "local":
+            top_desc, bottom_desc = describe_clothing(body_crop)
+        else:
+            # imported lazily: the local backends must work without an API key
+            from filters.clothing_ai import analyze_clothing_with_gpt
+            top_desc, bottom_desc = analyze_clothing_with_gpt(body_crop)
+        top_label = f"TOP: {top_desc}"
+        bottom_label = f"BOTTOM: {bottom_desc}"
+    except Exception:
+        top_label, bottom_label = DEFAULT_LABELS
+
+    return top_label, bottom_label
 
-    # ---- BODY HUD + TEXT ----
-    if body_bbox:
-        w, h = out.size
-        bx1, by1, bx2, by2 = _make_body_bbox(
-            body_bbox[0], body_bbox[1], body_bbox[2], body_bbox[3],
-            w, h, pad_ratio=0.10
-        )
 
-        body_crop = out.crop((bx1, by1, bx2, by2))
+# placeholder backend: remote labels fetched after the render, one request per input
+REMOTE_LABEL_ATTEMPTS = 2  # per memo key; after that the local labels stay
 
+_remote_pool = None
+_remote_pending = set()
+_remote_failures = {}
+_remote_lock = threading.Lock()
+
+
+def _fetch_remote_labels(memo, memo_key, image_pil, body_bbox, on_labels=None):
+    """
+    Fetch GPT labels in the background into memo["clothing", memo_key].
+    on_labels(labels) is only called once real labels are stored; a failed
+    call (no network / API key) is retried on a later render, at most
+    REMOTE_LABEL_ATTEMPTS times per key.
+    """
+    global _remote_pool
+    if memo is None or memo_key is None:
+        return  # nowhere to put the answer
+    job = (id(memo), memo_key)
+    with _remote_lock:
+        if job in _remote_pending or _remote_failures.get(job, 0) >= REMOTE_LABEL_ATTEMPTS:
+            return
+        _remote_pending.add(job)
+        if _remote_pool is None:
+            _remote_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="clothing")
+
+    def fetch():
+        stored = False
         try:
-            top_desc, bottom_desc = analyze_clothing_with_gpt(body_crop)
-            top_label = f"TOP: {top_desc}"
-            bottom_label = f"BOTTOM: {bottom_desc}"
-        except Exception:
-            top_label = "TOP: AI GENERATED TEXT"
-            bottom_label = "BOTTOM: AI GENERATED TEXT"
+            labels = _clothing_labels(image_pil, body_bbox, "gpt")
+            if labels is not None and labels != DEFAULT_LABELS:
+                memo.put("clothing", memo_key, labels)
+                stored = True
+        finally:
+            with _remote_lock:
+                _remote_pending.discard(job)
+                if not stored:
+                    _remote_failures[job] = _remote_failures.get(job, 0) + 1
+        if stored and on_labels is not None:
+            on_labels(labels)
+
+    _remote_pool.submit(fetch)
+
+
+#  DETECTION INPUT (optionally downscaled, boxes mapped back)
+def _detect_input(image_pil, max_side=None):
+    w, h = image_pil.size
+    if not max_side or max(w, h) <= max_side:
+        return image_pil, 1.0
+    scale = max_side / max(w, h)
+    small = image_pil.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.BILINEAR)
+    return small, scale
+
+
+def _unscale_box(bbox, scale):
+    if bbox is None or scale == 1.0:
+        return bbox
+    return tuple(v / scale for v in bbox)
+
+
+def _draw_overlays(image_pil, face_bbox, body_bbox, labels, labels_offset_y=None):
+    out = image_pil.copy()
+    face_frame_bbox = None
 
+    # ---- BODY HUD + TEXT ----
+    if body_bbox:
+        top_label, bottom_label = labels
         out = draw_body_box(
             out,
             body_bbox,
@@ -71,55 +183,88 @@ def apply_ai_overlay(image_pil, labels_offset_y=None):
     return out, face_frame_bbox
 
 
+#  AI OVERLAY (face HUD + body HUD + GPT clothing labels)
+def apply_ai_overlay(image_pil, labels_offset_y=None):
+    """
+    Detects face + body, draws HUD boxes,
+    generates clothing labels using GPT Vision.
+
+    Returns:
+        main_image_with_all_huds, face_frame_bbox
+    """
+
+    face_bbox = detect_face(image_pil)
+    body_bbox = detect_body(image_pil, model_body)
+    labels = _clothing_labels(image_pil, body_bbox)
+
+    return _draw_overlays(image_pil, face_bbox, body_bbox, labels, labels_offset_y)
+
+
 
 #  Saving final image (borders only)
-def save_filtered_image(img, src_path):
+def _output_path(src_path):
     base, _ = os.path.splitext(src_path)
-    out_path = base + "_filtered.png"
+    return base + "_filtered.png"
 
-    img = draw_borders_and_labels(img)
-    img.save(out_path, format="PNG")
 
-    return out_path
+def _save_png(img, src_path, compress_level=6, plan=None):
+    out_path = _output_path(src_path)
+    # the old output may be a hard link into the result cache; don't write through it
+    if os.path.exists(out_path):
+        os.remove(out_path)
 
+    pnginfo = None
+    if plan is not None:
+        # record what the latency budget gave up for this render
+        pnginfo = PngInfo()
+        pnginfo.add_text("cyberstyle:degradations", plan.describe())
 
+    img.save(out_path, format="PNG", compress_level=compress_level, pnginfo=pnginfo)
+    return out_path
 
-#  FULL PIPELINE
-def apply_filters_sequence(path, face_path=None, id_value="UNKNOWN"):
-    # 1) Load + style
-    img = Image.open(path).convert("RGB")
-    img = apply_stylistic_pipeline(img)
 
-    w, h = img.size
+def save_filtered_image(img, src_path, border_mask=None):
+    img = draw_borders_and_labels(img, mask=border_mask)
+    return _save_png(img, src_path)
 
-    # 2) Prepare face for PROFILE card
-    if face_path:
-        face_img = Image.open(face_path).convert("RGB")
-    else:
-        main_face_bbox = detect_face(img)
-        face_img = extract_face_crop(img, main_face_bbox) if main_face_bbox else None
 
-    face_card = make_face_card(face_img, id_value=id_value) if face_img is not None else None
 
-    # 3) Decide PROFILE card placement
-    labels_offset_y = None
-    card_x = card_y = None
+#  PROFILE card placement
+def _card_layout(image_size, body_bbox, face_card):
+    """
+    Returns dict(card_x, card_y, place_card_right, labels_offset_y).
+    """
+    w, h = image_size
+    layout = {
+        "card_x": None,
+        "card_y": None,
+        "place_card_right": False,
+        "labels_offset_y": None,
+    }
 
-    body_bbox_for_side = detect_body(img, model_body)
-    body_center_x = (body_bbox_for_side[0] + body_bbox_for_side[2]) / 2 if body_bbox_for_side else w/2
+    body_center_x = (body_bbox[0] + body_bbox[2]) / 2 if body_bbox else w/2
 
     if face_card is not None:
         place_card_right = body_center_x < (w / 2)
         side_margin = 60
         top_margin = 110
 
-        card_x = w - face_card.width - side_margin if place_card_right else side_margin
-        card_y = top_margin
+        layout["place_card_right"] = place_card_right
+        layout["card_x"] = w - face_card.width - side_margin if place_card_right else side_margin
+        layout["card_y"] = top_margin
+        layout["labels_offset_y"] = top_margin + face_card.height + 30
 
-        labels_offset_y = card_y + face_card.height + 30
+    return layout
+
+
+def _compose(img, face_bbox, body_bbox, labels, face_card, layout):
+    card_x = layout["card_x"]
+    card_y = layout["card_y"]
 
     # 4) Run overlays
-    img, face_frame_bbox = apply_ai_overlay(img, labels_offset_y=labels_offset_y)
+    img, face_frame_bbox = _draw_overlays(
+        img, face_bbox, body_bbox, labels, labels_offset_y=layout["labels_offset_y"]
+    )
 
     draw = ImageDraw.Draw(img)
 
@@ -135,7 +280,7 @@ def apply_filters_sequence(path, face_path=None, id_value="UNKNOWN"):
         frame_mid_y = (fy1 + fy2) // 2
         card_mid_y = card_y + face_card.height // 2
 
-        if place_card_right:
+        if layout["place_card_right"]:
             frame_anchor_x = fx2               
             card_anchor_x  = card_x            
         else:
@@ -153,10 +298,352 @@ def apply_filters_sequence(path, face_path=None, id_value="UNKNOWN"):
             width=3
         )
 
+    return img
+
 
 
+#  PIPELINE AS A STAGE GRAPH
+def _memoized(memo, stage, key, fn):
+    if memo is None or key is None:
+        return fn
 
+    def wrapped(*args):
+        return memo.get_or_compute(stage, key, lambda: fn(*args))
+    return wrapped
+
+
+def build_pipeline_graph(path, face_path=None, id_value="UNKNOWN", image=None, memo=None,
+                         preset=DEFAULT_PRESET, plan=None, style_timings=None, save=True,
+                         face_cascade=FACE_CASCADE, variants=None, clothing_backend=CLOTHING_BACKEND,
+                         on_labels=None, mem_profile=None):
+    """
+    Stages and their inputs:
+
+        load -> style -> detect_input -> face_bbox, body_bbox
+                                  (load reuses `image` if given;
+                                   face_cascade: face_bbox <- body_bbox too)
+        face_img   (face_path, or crop of style @ face_bbox)
+        face_card  <- face_img
+        clothing   <- style, body_bbox        (GPT call; the local estimate reads load)
+        layout     <- style, body_bbox, face_card
+        borders    <- load                    (mask only needs the size)
+        compose    <- style, face_bbox, body_bbox, clothing, face_card, layout
+        final      <- compose, borders
+        save       <- final                   (omitted with save=False)
+        size.<name>  <- compose, or the next larger size.<name>
+        save.<name>  <- size.<name>           (one per output variant)
+
+    With a StageMemo, everything up to face_img / clothing is reused when
+    the input file (hash + mtime) and the stage parameters are unchanged,
+    so changing only id_value re-runs face_card, layout, compose and save.
+
+    A BudgetPlan (filters.latency_budget) can skip style steps, shrink the
+    detector input, use memoized/local clothing labels and encode faster.
+
+    clothing_backend (see filters.clothing_local): "gpt", "local", or
+    "placeholder" = local labels now, GPT labels fetched in the background
+    into the memo; on_labels(labels) is called when they arrive.
+
+    `variants` (see filters.output_variants) adds smaller outputs; their
+    encodes are independent stages, so they run in parallel with each
+    other and with the full-size save.
+
+    mem_profile: a running StageMemoryProfile also gets the style steps.
+    """
+    g = StageGraph()
+    plan = plan or BudgetPlan()
+    skip = plan.skip_ops
+    det_side = plan.detect_max_side
+
+    # memo keys: input file + whatever else each stage depends on
+    src_key = memo.file_key(path) if memo is not None and image is None else None
+    face_key = memo.file_key(face_path) if memo is not None and face_path else None
+
+    def key(*params):
+        return (src_key,) + params if src_key is not None else None
+
+    # 1) Load + style
+    if image is not None:
+        g.add("load", lambda: image.convert("RGB"))
+    else:
+        g.add("load", _memoized(memo, "load", key(), lambda: Image.open(path).convert("RGB")))
+    g.add(
+        "style",
+        _memoized(
+            memo, "style", key(preset, skip),
+            lambda img: apply_stylistic_pipeline(img, preset=preset, skip=skip, timings=style_timings,
+                                                 mem_profile=mem_profile),
+        ),
+        deps=["load"],
+    )
+
+    g.add("detect_input", lambda img: _detect_input(img, det_side), deps=["style"])
+    g.add(
+        "body_bbox",
+        _memoized(
+            memo, "body_bbox", key(preset, skip, det_side, repr(model_body)),
+            lambda di: _unscale_box(detect_body(di[0], model_body), di[1]),
+        ),
+        deps=["detect_input"],
+    )
+    if face_cascade:
+        # a memo hit runs no detector and counts nothing
+        cascade_stats = g.stats["face_cascade"] = {"runs": 0, "fallbacks": 0}
+
+        def cascade(di, body_bbox):
+            small, scale = di
+            body_small = tuple(v * scale for v in body_bbox) if body_bbox else None
+            return _unscale_box(detect_face_cascade(small, body_small, stats=cascade_stats), scale)
+
+        g.add(
+            "face_bbox",
+            _memoized(
+                memo, "face_bbox",
+                key(preset, skip, det_side, repr(model_face), "cascade", FACE_CASCADE_IMGSZ), cascade,
+            ),
+            deps=["detect_input", "body_bbox"],
+        )
+    else:
+        g.add(
+            "face_bbox",
+            _memoized(
+                memo, "face_bbox", key(preset, skip, det_side, repr(model_face)),
+                lambda di: _unscale_box(detect_face(di[0]), di[1]),
+            ),
+            deps=["detect_input"],
+        )
 
-    # 6) Save final image
-    out_path = save_filtered_image(img, path)
+    # 2) Prepare face for PROFILE card
+    if face_path:
+        g.add(
+            "face_img",
+            _memoized(memo, "face_img", face_key, lambda: Image.open(face_path).convert("RGB")),
+        )
+    else:
+        g.add(
+            "face_img",
+            _memoized(
+                memo, "face_img", key(preset, skip, det_side, face_cascade),
+                lambda img, bbox: extract_face_crop(img, bbox) if bbox else None,
+            ),
+            deps=["style", "face_bbox"],
+        )
+
+    g.add(
+        "face_card",
+        lambda face_img: make_face_card(face_img, id_value=id_value) if face_img is not None else None,
+        deps=["face_img"],
+    )
+
+    if clothing_backend == "local":
+        g.add(
+            "clothing",
+            _memoized(
+                memo, "clothing", key("local", det_side),
+                lambda original, body_bbox: _clothing_labels(original, body_bbox, "local"),
+            ),
+            deps=["load", "body_bbox"],  # colours from the photo, not the tinted style image
+        )
+    elif plan.cached_labels or clothing_backend == "placeholder":
+        # don't wait on the network: last GPT labels for this input, else the local estimate
+        def quick_labels(img, original, body_bbox):
+            if not body_bbox:
+                return None
+            labels = memo.peek("clothing", key(preset)) if memo is not None else None
+            if labels is None:
+                labels = _clothing_labels(original, body_bbox, "local")
+                if clothing_backend == "placeholder":
+                    _fetch_remote_labels(memo, key(preset), img, body_bbox, on_labels)
+            return labels
+
+        g.add("clothing", quick_labels, deps=["style", "load", "body_bbox"])
+    else:
+        g.add("clothing", _memoized(memo, "clothing", key(preset), _clothing_labels), deps=["style", "body_bbox"])
+
+    # 3) Decide PROFILE card placement
+    g.add(
+        "layout",
+        lambda img, body_bbox, face_card: _card_layout(img.size, body_bbox, face_card),
+        deps=["style", "body_bbox", "face_card"],
+    )
+
+    g.add("borders", lambda img: make_border_mask(img.size), deps=["load"])
+
+    # 4-5) Overlays, card, connector
+    g.add(
+        "compose",
+        _compose,
+        deps=["style", "face_bbox", "body_bbox", "clothing", "face_card", "layout"],
+    )
+
+    # 6) Borders + save final image
+    g.add("final", lambda img, mask: draw_borders_and_labels(img, mask=mask), deps=["compose", "borders"])
+    if not save:
+        return g
+
+    g.add(
+        "save",
+        lambda img: _save_png(
+            img, path,
+            compress_level=1 if plan.fast_encode else 6,
+            plan=plan if plan.degradations else None,
+        ),
+        deps=["final"],
+    )
+
+    # 7) Output variants: pyramid from the composite, borders redrawn per size
+    prev = "compose"
+    for v in parse_variants(variants):
+        g.add(f"size.{v.name}", lambda img, side=v.max_side: downscale(img, side), deps=[prev])
+        g.add(f"save.{v.name}", lambda img, v=v: save_variant(img, path, v), deps=[f"size.{v.name}"])
+        prev = f"size.{v.name}"
+
+    return g
+
+
+def run_pipeline(path, face_path=None, id_value="UNKNOWN", parallel=True, max_workers=STAGE_WORKERS, image=None,
+                 memo=None, preset=DEFAULT_PRESET, plan=None, style_timings=None, save=True,
+                 face_cascade=FACE_CASCADE, variants=None, clothing_backend=CLOTHING_BACKEND,
+                 on_labels=None, on_stage=None, mem_profile=None):
+    """
+    Run the pipeline graph. Returns the StageRun
+    (results["save"] is the output path, results["final"] the image,
+    results["save.<name>"] the variant paths, .report() gives stage timings).
+    on_stage(name, value) is called as stages finish (see StageGraph.run).
+    mem_profile: a StageMemoryProfile to fill; forces a sequential run.
+    """
+    graph = build_pipeline_graph(
+        path, face_path=face_path, id_value=id_value, image=image, memo=memo, preset=preset,
+        plan=plan, style_timings=style_timings, save=save, face_cascade=face_cascade,
+        variants=variants, clothing_backend=clothing_backend, on_labels=on_labels,
+        mem_profile=mem_profile,
+    )
+    if mem_profile is None:
+        return graph.run(parallel=parallel, max_workers=max_workers, on_stage=on_stage)
+
+    mem_profile.instrument(graph)
+    mem_profile.start()
+    try:
+        return graph.run(parallel=False, on_stage=on_stage)
+    finally:
+        mem_profile.stop()
+
+
+
+@lru_cache(maxsize=1)
+def render_code_fingerprint():
+    """
+    Hash of the RENDER_MODULES sources, so editing any of them invalidates
+    cached renders without relying on a manual PIPELINE_VERSION bump.
+    """
+    h = hashlib.sha256()
+    for name in RENDER_MODULES:
+        with open(importlib.util.find_spec(name).origin, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def result_cache_key(path, face_path=None, id_value="UNKNOWN", preset=DEFAULT_PRESET,
+                     face_cascade=FACE_CASCADE, clothing_backend=CLOTHING_BACKEND):
+    return make_key(
+        path,
+        face_path,
+        id_value=id_value,
+        noise_seed=NOISE_SEED,
+        preset=get_preset(preset),
+        face_model=repr(model_face),
+        body_model=repr(model_body),
+        face_cascade=face_cascade and FACE_CASCADE_IMGSZ,
+        clothing_backend=clothing_backend,
+        version=PIPELINE_VERSION,
+        code=render_code_fingerprint(),
+    )
+
+
+
+#  FULL PIPELINE
+def apply_filters_sequence(path, face_path=None, id_value="UNKNOWN", parallel=True, memo=None, cache=None,
+                           preset=DEFAULT_PRESET, latency_budget=None, cost_model=None,
+                           face_cascade=FACE_CASCADE, variants=OUTPUT_VARIANTS,
+                           clothing_backend=CLOTHING_BACKEND, on_labels=None,
+                           progress=None, progress_size=(420, 420), mem_profile=None,
+                           max_workers=STAGE_WORKERS, stats=None, image=None, results=None):
+    """
+    Render `path` and return the output path.
+    With a ResultCache, unchanged inputs are served from the store
+    without running the pipeline.
+    latency_budget (seconds): degrade quality as needed to meet it, using
+    measured stage costs from `cost_model` (default: shared model that
+    learns from every run). Applied degradations are written into the
+    PNG as the "cyberstyle:degradations" text chunk.
+    variants: extra output sizes written in the same run (default from
+    OUTPUT_VARIANTS); the result cache only holds the full-size PNG, so it
+    is bypassed on lookup when variants are requested.
+    clothing_backend / on_labels: see build_pipeline_graph. Placeholder
+    renders are not cached, the labels in them are temporary.
+    progress(event, image, seconds): downscaled preview frames while the
+    pipeline runs ("style", "detect", "final"; see filters.preview).
+    Called from a background thread.
+    mem_profile: StageMemoryProfile for per-stage peak memory (sequential
+    run); with MEM_PROFILE=1 one is created and its report printed.
+    stats: dict that receives the run's counters (StageRun.stats, e.g.
+    "face_cascade"); stays empty on a result-cache hit.
+    image: the input, already decoded (e.g. by a pool worker); `path`
+    still names the output and keys the caches.
+    results: dict that receives the run's stage results (e.g. "final");
+    stays empty on a result-cache hit.
+    """
+    cost_model = cost_model or default_cost_model
+
+    if cache is not None:
+        key = result_cache_key(path, face_path, id_value, preset, face_cascade, clothing_backend)
+        out_path = _output_path(path)
+        if not variants and cache.fetch(key, out_path):
+            return out_path
+
+    plan = BudgetPlan()
+    if latency_budget is not None:
+        if image is not None:
+            size = image.size
+        else:
+            with Image.open(path) as im:
+                size = im.size  # header only
+        plan = plan_for_budget(
+            latency_budget, size, cost_model,
+            style_ops=preset_step_labels(preset), clothing_backend=clothing_backend,
+        )
+
+    print_mem = mem_profile is None and MEM_PROFILE
+    if print_mem:
+        mem_profile = StageMemoryProfile()
+
+    t0 = time.perf_counter()
+    style_timings = {}
+    publisher = PreviewPublisher(progress, _compose, progress_size) if progress is not None else None
+    try:
+        run = run_pipeline(
+            path, face_path=face_path, id_value=id_value, parallel=parallel, max_workers=max_workers,
+            image=image, memo=memo, preset=preset, plan=plan, style_timings=style_timings, face_cascade=face_cascade, variants=variants,
+            clothing_backend=clothing_backend, on_labels=on_labels,
+            on_stage=publisher.on_stage if publisher is not None else None,
+            mem_profile=mem_profile,
+        )
+    finally:
+        if publisher is not None:
+            publisher.close()
+    out_path = run.results["save"]
+    if stats is not None:
+        stats.update(run.stats)
+    if results is not None:
+        results.update(run.results)
+    if print_mem:
+        print(f"memory profile for {path}:\n{mem_profile.report()}")
+
+    # memo hits would teach the model zero-cost stages; profiled runs are sequential and slowed
+    if memo is None and mem_profile is None:
+        cost_model.observe_run(run, plan, style_timings, clothing_backend)
+
+    # degraded renders aren't cached, the next unhurried run should get full quality
+    if cache is not None and not plan.degradations and clothing_backend != "placeholder":
+        cache.store(key, out_path, seconds=time.perf_counter() - t0)
     return out_path
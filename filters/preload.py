@@ -0,0 +1,8 @@
+"""
+Imported by the worker forkserver (worker_pool.PRELOAD_MODULES): the
+pipeline and both detector models, loaded once before workers fork.
+"""
+import filters.pipeline  # noqa: F401
+from filters.detector import preload_detectors
+
+preload_detectors()
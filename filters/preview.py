@@ -0,0 +1,122 @@
+"""
+Progressive previews while the pipeline graph runs.
+
+    publisher = PreviewPublisher(callback, compose=_compose)
+    graph.run(on_stage=publisher.on_stage)
+    publisher.close()
+
+callback(event, image, seconds) receives downscaled frames, in order:
+    "style"   stylized image, right after the style stage
+    "detect"  boxes + PROFILE card, labels still pending
+    "final"   composed image with labels and borders
+`seconds` is the time since the publisher was created. Frames are built on
+a background thread so the stage scheduler is never held up, and a frame
+that is already superseded by a later one is dropped. A frame that fails
+to build or deliver is logged and skipped; the render goes on.
+"""
+import time
+import queue
+import logging
+import threading
+
+from PIL import Image
+
+EVENTS = ("style", "detect", "final")
+PENDING_LABELS = ("TOP: ANALYZING...", "BOTTOM: ANALYZING...")
+
+log = logging.getLogger(__name__)
+
+_DETECT_DEPS = ("style", "face_bbox", "body_bbox", "face_card", "layout")
+_LAYOUT_COORDS = ("card_x", "card_y", "labels_offset_y")
+# the overlays have fixed pixel sizes (labels are 260 px wide), so the detect
+# frame is drawn at this size, not at the preview size, then fit to the preview
+DRAW_SIDE = 1280
+
+
+def _fit(img, size):
+    """
+    Downscaled copy that fits in `size` (resized straight from the source,
+    no full-size copy first). Returns (image, scale).
+    """
+    scale = min(1.0, size[0] / img.width, size[1] / img.height)
+    if scale == 1.0:
+        return img.copy(), scale
+    new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(new_size, Image.BILINEAR, reducing_gap=2.0), scale
+
+
+def _scale_box(box, scale):
+    return tuple(v * scale for v in box) if box is not None else None
+
+
+class PreviewPublisher:
+    def __init__(self, callback, compose, size=(420, 420)):
+        self.callback = callback
+        self.compose = compose
+        self.size = size
+        self.t0 = time.perf_counter()
+        self._results = {}
+        self._latest = -1      # rank of the newest event queued
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="preview")
+        self._thread.start()
+
+    # ---- scheduler side ----
+    def on_stage(self, name, value):
+        self._results[name] = value
+        r = self._results
+
+        if name == "style":
+            self._queue("style", lambda: r["style"])
+        elif name in _DETECT_DEPS and "compose" not in r and all(k in r for k in _DETECT_DEPS):
+            self._queue("detect", lambda: self._detect_frame(r))
+        elif name == "final":
+            self._queue("final", lambda: r["final"])
+
+    def _queue(self, event, make_frame):
+        rank = EVENTS.index(event)
+        if rank <= self._latest:
+            return
+        self._latest = rank
+        self._q.put((rank, event, make_frame))
+
+    # ---- preview thread ----
+    def _detect_frame(self, r):
+        # draw on a downscaled frame, not the full-resolution style image
+        side = max(DRAW_SIDE, *self.size)
+        small, scale = _fit(r["style"], (side, side))
+        card = r["face_card"]
+        if card is not None and scale < 1.0:
+            card = card.resize(
+                (max(1, round(card.width * scale)), max(1, round(card.height * scale))), Image.BILINEAR
+            )
+        layout = dict(r["layout"])
+        for k in _LAYOUT_COORDS:
+            if layout[k] is not None:
+                layout[k] = int(layout[k] * scale)
+        return self.compose(
+            small, _scale_box(r["face_bbox"], scale), _scale_box(r["body_bbox"], scale),
+            PENDING_LABELS, card, layout,
+        )
+
+    def _worker(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            rank, event, make_frame = item
+            if rank < self._latest:
+                continue  # a later frame is already on its way
+            try:
+                frame, _ = _fit(make_frame(), self.size)
+                self.callback(event, frame, time.perf_counter() - self.t0)
+            except Exception:
+                # a preview is best effort: keep the thread alive for the later frames
+                log.exception("preview frame %r failed", event)
+
+    def close(self):
+        """
+        Wait for queued frames to be delivered.
+        """
+        self._q.put(None)
+        self._thread.join()
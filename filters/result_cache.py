@@ -0,0 +1,207 @@
+"""
+Content-addressed on-disk cache of final pipeline outputs.
+
+Layout:  <root>/<key[:2]>/<key>.png   (+ <key>.json with compute seconds)
+         <root>/.bytes                   running size of the store
+
+Entries are written to a temp file and renamed into place, so readers in
+other processes never see a partial file; eviction tolerates files that
+another process already removed.
+
+Hits are hard-linked to the caller's output path, so the .png mtime belongs
+to the user's file as much as to the cache: recency is kept on the .json
+sidecar instead, and entries that are still linked elsewhere don't count
+towards max_bytes (removing them would free nothing).
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction still works, just without the lock
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cyberstyle")
+)
+DEFAULT_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+# eviction goes this far below max_bytes, so it doesn't rescan on every store
+EVICT_TO = 0.8
+
+
+def _hash_file(h, path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+def make_key(path, face_path=None, **params):
+    """
+    sha256 over the input bytes, the face image bytes and the sorted params
+    (id, style settings, pipeline version, ...).
+    """
+    h = hashlib.sha256()
+    _hash_file(h, path)
+    h.update(b"\0face\0")
+    if face_path:
+        _hash_file(h, face_path)
+    h.update(b"\0params\0")
+    h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.avoided_seconds = 0.0
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key[:2], key + ".png")
+
+    def _sidecar_path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def fetch(self, key, out_path):
+        """
+        On a hit, hard-link (or copy) the cached output to out_path
+        and return True.
+        """
+        entry = self._entry_path(key)
+        try:
+            tmp = f"{out_path}.{os.getpid()}.tmp"
+            try:
+                os.link(entry, tmp)
+            except OSError:
+                shutil.copy2(entry, tmp)
+            os.replace(tmp, out_path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        sidecar = self._sidecar_path(key)
+        try:
+            os.utime(sidecar)  # LRU: eviction goes by the sidecar's mtime
+            with open(sidecar) as f:
+                self.avoided_seconds += json.load(f).get("seconds", 0.0)
+        except (OSError, ValueError):
+            pass
+        return True
+
+    def store(self, key, src_path, seconds=0.0):
+        entry = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        self._write_atomic(self._sidecar_path(key), json.dumps({"seconds": seconds}).encode("utf-8"))
+        with open(src_path, "rb") as f:
+            data = f.read()
+        self._write_atomic(entry, data)
+
+        self._added(len(data))
+
+    def _write_atomic(self, dest, data):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dest)
+
+    @contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.root, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ---- size cap ----
+    def _entries(self):
+        """
+        (last used, freeable bytes, path) for every entry. An entry that is
+        still hard-linked from an output frees nothing when removed, so it
+        counts as 0 bytes.
+        """
+        entries = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+                except FileNotFoundError:
+                    continue
+                try:
+                    used = os.stat(p[:-4] + ".json").st_mtime
+                except FileNotFoundError:
+                    used = st.st_mtime
+                entries.append((used, st.st_size if st.st_nlink == 1 else 0, p))
+        return entries
+
+    def _read_total(self):
+        try:
+            with open(os.path.join(self.root, ".bytes")) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write_total(self, total):
+        self._write_atomic(os.path.join(self.root, ".bytes"), str(total).encode("ascii"))
+
+    def _added(self, nbytes):
+        """
+        Add nbytes to the shared running total; only walk the store when
+        it goes over max_bytes (or the total hasn't been measured yet).
+        """
+        with self._lock():
+            total = self._read_total()
+            if total is None:
+                total = sum(size for _, size, _ in self._entries())
+            else:
+                total += nbytes
+            if total > self.max_bytes:
+                total = self._evict()
+            self._write_total(total)
+
+    def evict(self):
+        """
+        Remove least recently used entries until the store is at EVICT_TO
+        of max_bytes.
+        """
+        with self._lock():
+            self._write_total(self._evict())
+
+    def _evict(self):
+        # caller holds the lock
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            if not size:
+                continue  # still linked from an output, removing it frees nothing
+            for victim in (p, p[:-4] + ".json"):
+                try:
+                    os.remove(victim)
+                except FileNotFoundError:
+                    pass
+            total -= size
+        return total
+
+    def summary(self):
+        return (
+            f"cache {self.hits} hits / {self.misses} misses, "
+            f"avoided {self.avoided_seconds:.1f}s of compute"
+        )
@@ -0,0 +1,151 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Stage:
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class StageRun:
+    """
+    Result of running a StageGraph.
+    results: {stage_name: return value}
+    timings: {stage_name: (start, end)} in seconds, relative to run start
+    stats: counters the stages filled in (graph.stats), e.g. face_cascade
+    """
+
+    def __init__(self, graph, results, timings, wall):
+        self.graph = graph
+        self.results = results
+        self.timings = timings
+        self.wall = wall
+        self.stats = graph.stats
+
+    def durations(self):
+        return {name: end - start for name, (start, end) in self.timings.items()}
+
+    def critical_path(self):
+        """
+        Longest dependency chain by measured duration.
+        Returns (list_of_stage_names, total_seconds).
+        """
+        dur = self.durations()
+        finish = {}
+        prev = {}
+        for stage in self.graph.order():
+            best_dep = None
+            best_t = 0.0
+            for dep in stage.deps:
+                if finish[dep] > best_t or best_dep is None:
+                    best_dep, best_t = dep, finish[dep]
+            finish[stage.name] = best_t + dur.get(stage.name, 0.0)
+            prev[stage.name] = best_dep
+
+        if not finish:
+            return [], 0.0
+
+        last = max(finish, key=finish.get)
+        path = []
+        node = last
+        while node is not None:
+            path.append(node)
+            node = prev[node]
+        path.reverse()
+        return path, finish[last]
+
+    def report(self):
+        dur = self.durations()
+        path, total = self.critical_path()
+        lines = ["stage                 start     dur   critical"]
+        for stage in self.graph.order():
+            start, _ = self.timings[stage.name]
+            mark = "*" if stage.name in path else ""
+            lines.append(
+                f"{stage.name:<20} {start * 1000:7.1f}ms {dur[stage.name] * 1000:7.1f}ms  {mark}"
+            )
+        lines.append(f"critical path: {' -> '.join(path)} ({total * 1000:.1f}ms)")
+        lines.append(
+            f"wall: {self.wall * 1000:.1f}ms, sum of stages: {sum(dur.values()) * 1000:.1f}ms"
+        )
+        for name, counters in self.stats.items():
+            lines.append(f"{name}: " + ", ".join(f"{k} {v}" for k, v in counters.items()))
+        return "\n".join(lines)
+
+
+class StageGraph:
+    """
+    Dependency graph of named stages.
+    Each stage fn is called with the results of its deps, in order.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.stats = {}  # name -> {counter: value}, filled in by stage fns
+
+    def add(self, name, fn, deps=()):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self.stages[name] = Stage(name, fn, deps)
+        return self
+
+    def order(self):
+        # stages can only depend on already-added stages, so insertion order is topological
+        return list(self.stages.values())
+
+    def run(self, parallel=True, max_workers=4, on_stage=None):
+        """
+        on_stage(name, value) is called as each stage finishes, from the
+        scheduling thread; keep it cheap (hand work off to another thread).
+        """
+        on_stage = on_stage or (lambda name, value: None)
+        if parallel:
+            return self._run_parallel(max_workers, on_stage)
+        return self._run_sequential(on_stage)
+
+    def _call(self, stage, results, t0, timings):
+        start = time.perf_counter() - t0
+        value = stage.fn(*(results[d] for d in stage.deps))
+        timings[stage.name] = (start, time.perf_counter() - t0)
+        return value
+
+    def _run_sequential(self, on_stage):
+        results = {}
+        timings = {}
+        t0 = time.perf_counter()
+        for stage in self.order():
+            results[stage.name] = self._call(stage, results, t0, timings)
+            on_stage(stage.name, results[stage.name])
+        return StageRun(self, results, timings, time.perf_counter() - t0)
+
+    def _run_parallel(self, max_workers, on_stage):
+        results = {}
+        timings = {}
+        pending = {name: set(stage.deps) for name, stage in self.stages.items()}
+        running = {}
+        t0 = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                ready = [name for name, deps in pending.items() if not deps]
+                for name in ready:
+                    del pending[name]
+                    fut = pool.submit(self._call, self.stages[name], results, t0, timings)
+                    running[fut] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    # re-raises the stage's exception; remaining futures are
+                    # drained by the executor shutdown
+                    results[name] = fut.result()
+                    for deps in pending.values():
+                        deps.discard(name)
+                    on_stage(name, results[name])
+
+        return StageRun(self, results, timings, time.perf_counter() - t0)
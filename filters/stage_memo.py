@@ -0,0 +1,130 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _approx_size(value):
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, (tuple, list)):
+        return 64 + sum(_approx_size(v) for v in value)
+    return 64
+
+
+class StageMemo:
+    """
+    In-memory LRU of stage outputs, bounded by an approximate byte size.
+    Keys are (stage_name, key) where key captures the input file and the
+    parameters that stage depends on (see file_key()).
+    Thread-safe: the pipeline graph runs stages concurrently.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # (stage, key) -> (value, size)
+        self._file_keys = {}           # (path, mtime_ns, size) -> sha1
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def file_key(self, path):
+        """
+        (sha1, mtime_ns) of a file. The hash is only recomputed when
+        path/mtime/size change.
+        """
+        st = os.stat(path)
+        stat_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._file_keys.get(stat_key)
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            with self._lock:
+                self._file_keys[stat_key] = digest
+        return digest, st.st_mtime_ns
+
+    def get_or_compute(self, stage, key, compute):
+        entry_key = (stage, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                self.hits[stage] = self.hits.get(stage, 0) + 1
+                return entry[0]
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+
+        value = compute()
+        size = _approx_size(value)
+
+        with self._lock:
+            if size <= self.max_bytes and entry_key not in self._entries:
+                self._entries[entry_key] = (value, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, old_size) = self._entries.popitem(last=False)
+                    self.bytes -= old_size
+        return value
+
+    def peek(self, stage, key):
+        """
+        Stored value or None, without computing (counts as hit/miss).
+        """
+        entry_key = (stage, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses[stage] = self.misses.get(stage, 0) + 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+            return entry[0]
+
+    def put(self, stage, key, value):
+        """
+        Store a value computed elsewhere (e.g. a late network answer).
+        """
+        entry_key = (stage, key)
+        size = _approx_size(value)
+        with self._lock:
+            old = self._entries.pop(entry_key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size <= self.max_bytes:
+                self._entries[entry_key] = (value, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, old_size) = self._entries.popitem(last=False)
+                    self.bytes -= old_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            return {
+                "hits": hits,
+                "misses": misses,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "per_stage": {
+                    stage: (self.hits.get(stage, 0), self.misses.get(stage, 0))
+                    for stage in sorted(set(self.hits) | set(self.misses))
+                },
+            }
+
+    def summary(self):
+        s = self.stats()
+        return (
+            f"memo {s['hits']} hits / {s['misses']} misses, "
+            f"{s['entries']} entries, {s['bytes'] / 1e6:.0f} MB"
+        )
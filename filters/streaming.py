@@ -0,0 +1,149 @@
+"""
+Streaming batch API:
+
+    for res in render_stream(paths, id_value="PAX"):
+        print(res.path, "->", res.out_path, res.error)
+
+Three stages connected by bounded queues:
+    decode threads  -> [prefetch]  -> pipeline core -> [writeback] -> writer threads
+Decoding and PNG encoding/saving overlap with the pipeline core, and at most
+prefetch + writeback (+ one per thread) images are held in memory no matter
+how long `paths` is (it can be a lazy iterable). Results are yielded in
+completion order.
+"""
+import queue
+import threading
+from collections import namedtuple
+
+from PIL import Image
+
+from filters.pipeline import run_pipeline, _save_png
+from filters.style_presets import DEFAULT_PRESET
+
+StreamResult = namedtuple("StreamResult", "path out_path error")
+
+_DONE = object()
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def render_stream(paths, face_path=None, id_value="UNKNOWN", preset=DEFAULT_PRESET,
+                  decode_threads=2, write_threads=2, prefetch=4, writeback=4,
+                  parallel=True):
+    stop = threading.Event()
+    path_q = queue.Queue(maxsize=decode_threads * 2)
+    decoded_q = queue.Queue(maxsize=prefetch)
+    write_q = queue.Queue(maxsize=writeback)
+    done_q = queue.Queue()
+
+    # ---- feeder: lazily pulls from `paths` ----
+    def feeder():
+        try:
+            for path in paths:
+                if not _put(path_q, path, stop):
+                    return
+        finally:
+            for _ in range(decode_threads):
+                _put(path_q, _DONE, stop)
+
+    # ---- decoders ----
+    def decoder():
+        while True:
+            path = _get(path_q, stop)
+            if path is _DONE:
+                _put(decoded_q, _DONE, stop)
+                return
+            try:
+                img = Image.open(path).convert("RGB")
+                item = (path, img, None)
+            except Exception as e:
+                item = (path, None, e)
+            if not _put(decoded_q, item, stop):
+                return
+
+    # ---- writers ----
+    def writer():
+        while True:
+            item = _get(write_q, stop)
+            if item is _DONE:
+                done_q.put(_DONE)
+                return
+            path, img = item
+            try:
+                done_q.put(StreamResult(path, _save_png(img, path), None))
+            except Exception as e:
+                done_q.put(StreamResult(path, None, e))
+
+    threads = [threading.Thread(target=feeder, daemon=True, name="stream-feed")]
+    threads += [threading.Thread(target=decoder, daemon=True, name=f"stream-decode-{i}")
+                for i in range(decode_threads)]
+    threads += [threading.Thread(target=writer, daemon=True, name=f"stream-write-{i}")
+                for i in range(write_threads)]
+    for t in threads:
+        t.start()
+
+    def drain(block):
+        while True:
+            try:
+                yield done_q.get(block=block)
+            except queue.Empty:
+                return
+
+    writers_left = write_threads
+    try:
+        # ---- pipeline core (runs in the consumer's thread) ----
+        decoders_left = decode_threads
+        while decoders_left:
+            item = _get(decoded_q, stop)
+            if item is _DONE:
+                decoders_left -= 1
+                continue
+            path, img, err = item
+            if err is not None:
+                yield StreamResult(path, None, err)
+                continue
+
+            try:
+                run = run_pipeline(
+                    path, face_path=face_path, id_value=id_value, preset=preset,
+                    image=img, parallel=parallel, save=False,
+                )
+                _put(write_q, (path, run.results["final"]), stop)
+            except Exception as e:
+                yield StreamResult(path, None, e)
+            del img
+
+            for res in drain(block=False):
+                if res is _DONE:
+                    writers_left -= 1
+                else:
+                    yield res
+
+        for _ in range(write_threads):
+            _put(write_q, _DONE, stop)
+
+        while writers_left:
+            res = done_q.get()
+            if res is _DONE:
+                writers_left -= 1
+            else:
+                yield res
+    finally:
+        stop.set()  # consumer stopped early or we're done: release all threads
@@ -1,14 +1,84 @@
-from PIL import Image, ImageFilter, ImageEnhance, ImageOps
+from PIL import Image
 import math
+import zlib
+import numpy as np
 
-def cool_green_tint(img, strength=0.22):
-    overlay = Image.new("RGB", img.size, (20, 110, 120))
-    return Image.blend(img, overlay, strength)
+# Noise texture pool
+NOISE_TILE_SIZE = 256
+NOISE_TILE_COUNT = 4
+NOISE_SIGMA = 100
+NOISE_SEED = 0
 
-def add_noise(img, amount=0.06):
-    noise = Image.effect_noise(img.size, 100).convert("L")
-    noise_rgb = Image.merge("RGB", [noise]*3)
-    return Image.blend(img, noise_rgb, amount)
+class NoisePool:
+    """
+    A few pregenerated gaussian noise tiles (same distribution as
+    Image.effect_noise). White noise has no spatial correlation, so the
+    tiles wrap seamlessly and can be rolled / repeated to any size.
+    """
+
+    def __init__(self, tile_size=NOISE_TILE_SIZE, n_tiles=NOISE_TILE_COUNT,
+                 sigma=NOISE_SIGMA, seed=NOISE_SEED):
+        rng = np.random.default_rng(seed)
+        self.tile_size = tile_size
+        self.tiles = [
+            np.clip(rng.normal(128, sigma, (tile_size, tile_size)), 0, 255)
+            .astype(np.uint8)
+            for _ in range(n_tiles)
+        ]
+
+    def texture(self, size, seed=NOISE_SEED):
+        """
+        "L" noise image of `size`. Tile choice and offset come from `seed`
+        (an int or a sequence of ints), so the same (size, seed) always
+        gives the same texture.
+        """
+        w, h = size
+        ts = self.tile_size
+        rng = np.random.default_rng(seed)
+
+        tile = self.tiles[int(rng.integers(len(self.tiles)))]
+        dy, dx = rng.integers(ts, size=2)
+        tile = np.roll(tile, (int(dy), int(dx)), axis=(0, 1))
+
+        reps = (-(-h // ts), -(-w // ts))
+        return Image.fromarray(np.tile(tile, reps)[:h, :w])
+
+
+_noise_pool = None
+
+
+def get_noise_pool():
+    global _noise_pool
+    if _noise_pool is None:
+        _noise_pool = NoisePool()
+    return _noise_pool
+
+
+def _image_seed(img):
+    # a few sampled pixels: other photos get other grain, the same photo the same grain
+    return zlib.crc32(img.resize((16, 16), Image.NEAREST).tobytes())
+
+
+def add_noise(img, amount=0.06, seed=NOISE_SEED):
+    """
+    Blend grain into `img` one tile-high strip at a time, so no full-frame
+    noise image is built (or kept). Tile and offset come from `seed` and
+    the image itself.
+    """
+    pool = get_noise_pool()
+    ts = pool.tile_size
+    w, h = img.size
+
+    # the texture repeats every tile, so one strip serves every row band
+    strip = pool.texture((w, ts), (seed, _image_seed(img)))
+    strip = Image.merge("RGB", [strip] * 3)
+
+    out = Image.new(img.mode, img.size)
+    for y in range(0, h, ts):
+        box = (0, y, w, min(h, y + ts))
+        noise = strip if box[3] - y == ts else strip.crop((0, 0, w, box[3] - y))
+        out.paste(Image.blend(img.crop(box), noise, amount), box)
+    return out
 
 def make_vignette_mask(size, strength=0.85):
     w, h = size
@@ -25,21 +95,12 @@ def make_vignette_mask(size, strength=0.85):
 
     return mask
 
-def apply_stylistic_pipeline(img):
-    img = img.convert("RGB")
-
-    from .stylistic_filters import cool_green_tint, add_noise, make_vignette_mask
-
-    img = cool_green_tint(img, 0.22)
-
-    mask = make_vignette_mask(img.size, 0.85)
-    dark = Image.new("RGB", img.size, (0,0,0))
-    img = Image.composite(Image.blend(img, dark, 0.45), img, ImageOps.invert(mask))
-
-    img = add_noise(img)
-    img = ImageEnhance.Contrast(img).enhance(1.18)
-
-    img = img.filter(ImageFilter.GaussianBlur(0.6))
-    img = img.filter(ImageFilter.UnsharpMask(radius=1.2, percent=140, threshold=3))
+def apply_stylistic_pipeline(img, seed=NOISE_SEED, preset=None, skip=(), timings=None, mem_profile=None):
+    """
+    Run a named style preset (filters/presets.json, default "cyber":
+    tint+contrast in one pass, vignette, noise, blur, unsharp).
+    """
+    from .style_presets import apply_preset, DEFAULT_PRESET
 
-    return img
+    return apply_preset(img, preset or DEFAULT_PRESET, seed=seed, skip=skip, timings=timings,
+                        mem_profile=mem_profile)
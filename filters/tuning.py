@@ -0,0 +1,169 @@
+"""
+Throughput tuning: calibrate worker processes / detector threads / stage
+threads on this host and store the winner in a profile file
+(the command is calibrate.py in the project root).
+
+The profile (TUNING_PROFILE, default ~/.cache/cyberstyle/tuning.json) is
+read at import time: DETECTOR_THREADS, the pipeline's stage thread pool
+and the default worker count of WarmWorkerPool / make_process_executor /
+watch_daemon.py all fall back to it. Explicit env vars and arguments
+still win. A profile calibrated on a host with a different core count is
+ignored.
+"""
+import os
+import json
+import time
+import logging
+import statistics
+from functools import lru_cache
+
+log = logging.getLogger(__name__)
+
+TUNING_PROFILE = os.getenv(
+    "TUNING_PROFILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "cyberstyle", "tuning.json"),
+)
+
+# used when there is no profile (or it was calibrated on another host)
+DEFAULT_PROFILE = {
+    "workers": None,          # None = cpu_count // 2
+    "detector_threads": 0,    # 0 = library default
+    "stage_workers": 4,       # StageGraph thread pool per render
+}
+
+
+@lru_cache(maxsize=1)
+def load_profile(path=TUNING_PROFILE):
+    profile = dict(DEFAULT_PROFILE)
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return profile
+    except (OSError, ValueError) as e:
+        log.warning("ignoring unreadable tuning profile %s: %r", path, e)
+        return profile
+
+    if saved.get("cpu_count") != os.cpu_count():
+        log.warning(
+            "ignoring tuning profile %s: calibrated for %s cores, this host has %s",
+            path, saved.get("cpu_count"), os.cpu_count(),
+        )
+        return profile
+
+    for name in DEFAULT_PROFILE:
+        if name in saved:
+            profile[name] = saved[name]
+    return profile
+
+
+def save_profile(profile, path=TUNING_PROFILE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, path)
+    load_profile.cache_clear()
+
+
+# =========================
+# CALIBRATION
+# =========================
+def candidate_configs(cpu_count=None):
+    """
+    (workers, detector_threads, stage_workers) combinations that don't
+    oversubscribe the cores with detector threads.
+    """
+    cpus = cpu_count or os.cpu_count() or 1
+    workers = sorted({1, 2, max(1, cpus // 2), cpus} & set(range(1, cpus + 1)))
+    configs = []
+    for w in workers:
+        per_worker = max(1, cpus // w)
+        for t in sorted({1, 2, per_worker} & set(range(1, per_worker + 1))):
+            for s in (1, 2, 4):
+                configs.append((w, t, s))
+    return configs
+
+
+def synthetic_inputs(workdir, count, megapixels=2.0):
+    """
+    Photos-like test inputs: gradient background, noise, a "person".
+    """
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    h = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    w = h * 4 // 3
+    paths = []
+    for i in range(count):
+        arr = np.empty((h, w, 3), dtype=np.uint8)
+        arr[..., 0] = np.linspace(0, 255, w, dtype=np.float32)
+        arr[..., 1] = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+        arr[..., 2] = (i * 37) % 256
+        arr[int(h * 0.3):int(h * 0.9), int(w * 0.4):int(w * 0.6)] = (200, 30, 30)
+        arr = np.clip(arr + rng.normal(0, 8, arr.shape), 0, 255).astype(np.uint8)
+        path = os.path.join(workdir, f"calib_{i:03d}.jpg")
+        Image.fromarray(arr).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def _timed_render(path, **kwargs):
+    from filters.worker_pool import render_path
+
+    t0 = time.perf_counter()
+    render_path(path, **kwargs)
+    return time.perf_counter() - t0
+
+
+def measure_config(paths, workers, detector_threads, stage_workers):
+    """
+    Render `paths` with a fresh process pool. Returns images/sec and
+    per-image latency (p50/p95, measured inside the workers).
+    """
+    from filters.worker_pool import make_process_executor
+
+    kwargs = {
+        "variants": None,
+        "clothing_backend": "local",  # the network call isn't something we can tune
+        "max_workers": stage_workers,
+    }
+    with make_process_executor(workers, detector_threads=detector_threads) as ex:
+        # warm-up: one image per worker (model init, caches)
+        for f in [ex.submit(_timed_render, p, **kwargs) for p in paths[:workers]]:
+            f.result()
+
+        t0 = time.perf_counter()
+        futures = [ex.submit(_timed_render, p, **kwargs) for p in paths]
+        latencies = [f.result() for f in futures]
+        wall = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "images_per_sec": len(paths) / wall,
+        "p50_latency": statistics.median(latencies),
+        "p95_latency": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def calibrate(paths, configs, max_latency=None):
+    """
+    Measure every config; best = highest images/sec among those whose p95
+    latency is within max_latency (if given). Returns (best, all_results).
+    """
+    results = []
+    for workers, threads, stage_workers in configs:
+        m = measure_config(paths, workers, threads, stage_workers)
+        m.update(workers=workers, detector_threads=threads, stage_workers=stage_workers)
+        results.append(m)
+        print(
+            f"  workers={workers:<2} detector_threads={threads:<2} stage_workers={stage_workers}"
+            f"  {m['images_per_sec']:6.2f} img/s  p50 {m['p50_latency']:.2f}s  p95 {m['p95_latency']:.2f}s"
+        )
+
+    eligible = [r for r in results if max_latency is None or r["p95_latency"] <= max_latency]
+    if not eligible:
+        print(f"no config meets p95 <= {max_latency}s, picking the lowest latency")
+        return min(results, key=lambda r: r["p95_latency"]), results
+    return max(eligible, key=lambda r: r["images_per_sec"]), results
@@ -0,0 +1,386 @@
+"""
+Long-lived worker processes for batch rendering.
+
+Workers are forked from a forkserver that has already imported
+filters.preload (the pipeline plus both YOLO models), so models load
+once per pool rather than once per worker. Decoded images travel through
+multiprocessing.shared_memory instead of being pickled through the
+queues: the parent copies the RGB pixels into a segment, the worker maps
+it as a NumPy view and copies it into a PIL image (Pillow keeps RGB at 4
+bytes per pixel, so it can't wrap the 3-byte segment), runs the pipeline
+and writes the final image back into the same segment, which the parent
+copies out. Nothing is pickled but small tuples through the queues.
+
+    python -m filters.worker_pool --measure photo.jpg
+"""
+import sys
+import time
+import signal
+import queue
+import pickle
+import argparse
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from filters.tuning import load_profile
+
+PRELOAD_MODULES = ["filters.preload"]
+MAX_JOBS_PER_WORKER = 50
+
+
+def _get_context():
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+        return ctx
+    return mp.get_context("spawn")
+
+
+def default_workers():
+    return load_profile()["workers"] or max(1, (mp.cpu_count() or 2) // 2)
+
+
+def _attach(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _render_pipeline(image, path, face_path, id_value, latency_budget=None):
+    # the shared entry point: output variants, budget plan and cost model as for any render
+    from filters.pipeline import apply_filters_sequence
+
+    results = {}
+    out_path = apply_filters_sequence(
+        path, face_path=face_path, id_value=id_value, image=image,
+        latency_budget=latency_budget, results=results,
+    )
+    return results["final"], out_path
+
+
+def _render_passthrough(image, path, face_path, id_value, latency_budget=None):
+    # measure_ipc_overhead: the worker path without the pipeline
+    return image, path
+
+
+def _ignore_sigint():
+    # workers share the terminal's process group: Ctrl-C is for the parent,
+    # which finishes or requeues their jobs itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _worker_main(jobs, results, max_jobs, render=_render_pipeline):
+    _ignore_sigint()
+    for _ in range(max_jobs):
+        job = jobs.get()
+        if job is None:
+            break
+
+        job_id, shm_name, shape, path, face_path, id_value, latency_budget = job
+        t0 = time.perf_counter()
+        try:
+            shm, view = _attach(shm_name, shape)
+        except FileNotFoundError:
+            # its map() was abandoned and the segment already released
+            results.put((job_id, None, 0.0, "shared memory segment gone"))
+            continue
+        try:
+            final, out_path = render(Image.fromarray(view), path, face_path, id_value, latency_budget)
+            view[:] = np.asarray(final)
+            results.put((job_id, out_path, time.perf_counter() - t0, None))
+        except Exception as e:
+            results.put((job_id, None, 0.0, repr(e)))
+        finally:
+            del view
+            shm.close()
+
+
+def _release(shm):
+    shm.close()
+    shm.unlink()
+
+
+class WarmWorkerPool:
+    """
+    Usage:
+        with WarmWorkerPool(workers=4) as pool:
+            for out_path, final_img in pool.map(paths, id_value="A12", cache=cache):
+                ...
+            print(pool.summary())
+    Each worker exits after `max_jobs_per_worker` jobs and is replaced,
+    which caps memory growth from long-running torch processes.
+    `render(image, path, face_path, id_value, latency_budget) -> (final_image, out_path)`
+    is what the workers run (a module-level function; default:
+    apply_filters_sequence on the decoded image).
+    """
+
+    def __init__(self, workers=None, max_jobs_per_worker=MAX_JOBS_PER_WORKER, render=_render_pipeline):
+        self.ctx = _get_context()
+        self.workers = workers or default_workers()
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.render = render
+
+        self._jobs = self.ctx.Queue()
+        self._results = self.ctx.Queue()
+        self._procs = []
+        self._ids = itertools.count()
+        self.recycled = 0
+        self.rendered = 0
+        self.cache_hits = 0
+        self.saved_seconds = 0.0   # compute time the cache hits stood in for
+
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self):
+        p = self.ctx.Process(
+            target=_worker_main,
+            args=(self._jobs, self._results, self.max_jobs_per_worker, self.render),
+            daemon=True,
+        )
+        p.start()
+        self._procs.append(p)
+
+    def _reap(self):
+        for p in list(self._procs):
+            if p.is_alive():
+                continue
+            p.join()
+            self._procs.remove(p)
+            if p.exitcode != 0:
+                raise RuntimeError(f"Worker {p.pid} died with exit code {p.exitcode}")
+            self.recycled += 1
+            self._spawn()
+
+    def _submit(self, img, path, face_path, id_value, latency_budget=None):
+        """
+        Copy a decoded RGB array into a new segment and queue it.
+        Returns (job_id, shm); the caller releases the segment.
+        """
+        shm = shared_memory.SharedMemory(create=True, size=img.nbytes)
+        np.ndarray(img.shape, dtype=np.uint8, buffer=shm.buf)[:] = img
+        job_id = next(self._ids)
+        self._jobs.put((job_id, shm.name, img.shape, path, face_path, id_value, latency_budget))
+        return job_id, shm
+
+    def _collect(self, pending):
+        """
+        Wait for one job of `pending` (job_id -> (shm, shape)) to finish,
+        read its final image and free its segment.
+        Returns (job_id, out_path, seconds, final_image).
+        """
+        while True:
+            self._reap()
+            try:
+                job_id, out_path, seconds, err = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job_id not in pending:
+                continue  # left over from an abandoned map()
+            shm, shape = pending.pop(job_id)
+            try:
+                if err is not None:
+                    raise RuntimeError(f"Job {job_id} failed: {err}")
+                view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                final = Image.fromarray(view)  # copies: RGB can't share the buffer
+                del view
+            finally:
+                _release(shm)
+            return job_id, out_path, seconds, final
+
+    def map(self, paths, face_path=None, id_value="UNKNOWN", cache=None, max_inflight=None,
+            latency_budget=None):
+        """
+        Render each path. Yields (out_path, final_image) as jobs finish,
+        i.e. in completion order. At most max_inflight images (default
+        workers * 2) are decoded into shared memory at a time and each
+        segment is freed as soon as its result has been read.
+        With a ResultCache, hits are served from the store in the parent
+        (final_image is then opened lazily from disk); as in
+        apply_filters_sequence, lookups are skipped when OUTPUT_VARIANTS
+        are configured. latency_budget is passed on to
+        apply_filters_sequence; those renders may be degraded and aren't
+        stored in the cache.
+        """
+        from filters.pipeline import result_cache_key, _output_path, CLOTHING_BACKEND, OUTPUT_VARIANTS
+
+        max_inflight = max_inflight or self.workers * 2
+        todo = iter(paths)
+        pending = {}   # job_id -> (shm, shape)
+        keys = {}
+        try:
+            while True:
+                for path in todo:
+                    key = None
+                    if cache is not None:
+                        key = result_cache_key(path, face_path, id_value)
+                        out_path = _output_path(path)
+                        avoided = cache.avoided_seconds
+                        if not OUTPUT_VARIANTS and cache.fetch(key, out_path):
+                            self.cache_hits += 1
+                            self.saved_seconds += cache.avoided_seconds - avoided
+                            yield out_path, Image.open(out_path)
+                            continue
+
+                    img = np.asarray(Image.open(path).convert("RGB"))
+                    job_id, shm = self._submit(img, path, face_path, id_value, latency_budget)
+                    pending[job_id] = (shm, img.shape)
+                    del img
+                    # placeholder labels are temporary, those renders aren't cached
+                    if key is not None and CLOTHING_BACKEND != "placeholder" and latency_budget is None:
+                        keys[job_id] = key
+                    if len(pending) >= max_inflight:
+                        break
+
+                if not pending:
+                    return
+                job_id, out_path, seconds, final = self._collect(pending)
+                self.rendered += 1
+                key = keys.pop(job_id, None)
+                if key is not None:
+                    cache.store(key, out_path, seconds=seconds)
+                yield out_path, final
+        finally:
+            for shm, _ in pending.values():
+                _release(shm)
+
+    def summary(self):
+        return (
+            f"{self.rendered} rendered, {self.cache_hits} from cache"
+            f" (avoided {self.saved_seconds:.1f}s of compute), {self.recycled} workers recycled"
+        )
+
+    def close(self):
+        for _ in self._procs:
+            self._jobs.put(None)
+        for p in self._procs:
+            p.join()
+        self._procs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+#  Path-based jobs (daemon / service): no image hand-off, workers read from disk
+_worker_cache = None
+
+
+def render_path(path, face_path=None, id_value="UNKNOWN", cache_dir=None, **kwargs):
+    """
+    Run apply_filters_sequence in a pool worker.
+    cache_dir enables the shared on-disk ResultCache.
+    Returns (out_path, info); info has "cache_hit", "saved_seconds"
+    (compute the hit stood in for) and the run's counters (e.g.
+    "face_cascade"), for the parent to add up.
+    """
+    global _worker_cache
+    from filters.pipeline import apply_filters_sequence
+    from filters.result_cache import ResultCache
+
+    cache = None
+    if cache_dir:
+        if _worker_cache is None or _worker_cache.root != cache_dir:
+            _worker_cache = ResultCache(cache_dir)
+        cache = _worker_cache
+
+    hits, avoided = (cache.hits, cache.avoided_seconds) if cache is not None else (0, 0.0)
+    stats = {}
+    out_path = apply_filters_sequence(
+        path, face_path=face_path, id_value=id_value, cache=cache, stats=stats, **kwargs
+    )
+    info = {"cache_hit": False, "saved_seconds": 0.0}
+    if cache is not None:
+        info = {"cache_hit": cache.hits > hits, "saved_seconds": cache.avoided_seconds - avoided}
+    info.update(stats)
+    return out_path, info
+
+
+def _init_worker(detector_threads=None):
+    _ignore_sigint()
+    if detector_threads is not None:
+        from filters.detector import set_detector_threads
+
+        set_detector_threads(detector_threads)
+
+
+def make_process_executor(workers=None, max_jobs_per_worker=MAX_JOBS_PER_WORKER, detector_threads=None):
+    """
+    ProcessPoolExecutor whose workers come from the preloaded forkserver
+    and are replaced after max_jobs_per_worker tasks.
+    workers / detector_threads default to the tuning profile.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers or default_workers(),
+        mp_context=_get_context(),
+        max_tasks_per_child=max_jobs_per_worker,
+        initializer=_init_worker,
+        initargs=(detector_threads,),
+    )
+
+
+#  IPC overhead measurement (the real worker path, pipeline replaced by a pass-through)
+def _echo_pickled(jobs, results):
+    while True:
+        arr = jobs.get()
+        if arr is None:
+            break
+        results.put(np.asarray(Image.fromarray(arr)))
+
+
+def measure_ipc_overhead(img_np, runs=20):
+    """
+    Round-trip time per image for (a) pickling the array through queues
+    and (b) the WarmWorkerPool hand-off: forkserver worker, shared memory
+    in, PIL image in the worker, final pixels written back and copied out.
+    Returns {"pickle": s, "shm": s}.
+    """
+    ctx = _get_context()
+    timings = {}
+
+    jobs, results = ctx.Queue(), ctx.Queue()
+    p = ctx.Process(target=_echo_pickled, args=(jobs, results), daemon=True)
+    p.start()
+    times = []
+    for _ in range(runs + 1):
+        t0 = time.perf_counter()
+        jobs.put(img_np)
+        results.get()
+        times.append(time.perf_counter() - t0)
+    jobs.put(None)
+    p.join()
+    timings["pickle"] = sum(times[1:]) / runs  # first run is warm-up
+
+    with WarmWorkerPool(workers=1, render=_render_passthrough) as pool:
+        times = []
+        for _ in range(runs + 1):
+            t0 = time.perf_counter()
+            job_id, shm = pool._submit(img_np, "", None, "UNKNOWN")
+            pool._collect({job_id: (shm, img_np.shape)})
+            times.append(time.perf_counter() - t0)
+    timings["shm"] = sum(times[1:]) / runs
+
+    return timings
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--measure", metavar="IMAGE", required=True)
+    ap.add_argument("--runs", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    img_np = np.asarray(Image.open(args.measure).convert("RGB"))
+    t = measure_ipc_overhead(img_np, runs=args.runs)
+    print(f"image {img_np.shape[1]}x{img_np.shape[0]} ({len(pickle.dumps(img_np)) / 1e6:.1f} MB pickled)")
+    print(f"  pickle round trip: {t['pickle'] * 1000:.1f} ms/image")
+    print(f"  shm round trip:    {t['shm'] * 1000:.1f} ms/image")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
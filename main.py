@@ -2,12 +2,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import time
+import logging
+import threading
 from pathlib import Path
-from PIL import Image
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
 from filters.pipeline import apply_filters_sequence
+from filters.stage_memo import StageMemo
+from ui.thumbnail_cache import ThumbnailCache
+from ui.gallery import GalleryView
+from ui.tk_dispatch import TkDispatcher
 
 # Preview size
 PREVIEW_W = 420
@@ -34,6 +40,16 @@ class CyberFilterApp(ctk.CTk):
         self.preview_main_ctkimg = None
         self.preview_out_ctkimg = None
 
+        # reuse styling / detections / GPT labels when only the ID changes
+        self.stage_memo = StageMemo()
+
+        # preview + gallery thumbnails (on-disk, keyed by path + mtime)
+        self.thumbs = ThumbnailCache()
+        self.gallery_window = None
+
+        # results from the pipeline thread are handed to the Tk thread through this
+        self.dispatch = TkDispatcher(self)
+
         # ---------- LAYOUT: 2 COLUMNS ----------
         self.grid_columnconfigure(0, weight=0)   # left panel
         self.grid_columnconfigure(1, weight=1)   # right panel
@@ -157,7 +173,19 @@ class CyberFilterApp(ctk.CTk):
                 height=32
             )
         self.custom_id_entry.grid(row=1, column=0, padx=12, pady=(0, 10), sticky="ew")
-            
+
+        # ---- BATCH RESULTS ----
+        batch = ctk.CTkFrame(left, corner_radius=12, fg_color=("gray14", "gray15"))
+        batch.grid(row=5, column=0, padx=12, pady=(0, 12), sticky="ew")
+        batch.grid_columnconfigure(0, weight=1)
+
+        ctk.CTkButton(
+            batch,
+            text="Browse Batch Results",
+            command=self.on_browse_results,
+            height=32
+        ).grid(row=0, column=0, padx=12, pady=10, sticky="ew")
+
     def _build_right_panel(self):
         right = ctk.CTkFrame(self, corner_radius=16)
         right.grid(row=0, column=1, sticky="nsew", padx=(0, 12), pady=12)
@@ -213,8 +241,8 @@ class CyberFilterApp(ctk.CTk):
         if not path or not os.path.exists(path):
             return None
 
-        img = Image.open(path).convert("RGB")
-        img.thumbnail((max_w, max_h), Image.LANCZOS)
+        # PNG on disk: the previews show fine lines and small label text
+        img = self.thumbs.get(path, (max_w, max_h), lossless=True)
         return ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
 
     def _update_main_preview(self):
@@ -284,28 +312,118 @@ class CyberFilterApp(ctk.CTk):
 
         self.status_label.configure(text="Running pipeline...", text_color="#00ffb3")
         self.process_button.configure(state="disabled")
-        
-        custom_id = self.custom_id_entry.get().strip().upper()
+        self._first_preview_s = None
 
-        out_path = apply_filters_sequence(
-            self.main_image_path,
-            face_path=self.face_image_path,
-            id_value=custom_id if custom_id else "UNKNOWN"
-        )
+        # pipeline runs off the Tk thread; preview frames come back through self.dispatch
+        args = self._current_run()
+        threading.Thread(target=self._run_pipeline, args=args, daemon=True).start()
 
+    def _current_run(self):
+        # (path, face_path, id_value) the pipeline would run with right now
+        custom_id = self.custom_id_entry.get().strip().upper()
+        return (self.main_image_path, self.face_image_path, custom_id if custom_id else "UNKNOWN")
+
+    def _run_pipeline(self, path, face_path, id_value):
+        t0 = time.perf_counter()
+        run = (path, face_path, id_value)
+        try:
+            out_path = apply_filters_sequence(
+                path,
+                face_path=face_path,
+                id_value=id_value,
+                memo=self.stage_memo,
+                on_labels=lambda labels: self._on_labels_upgraded(run, labels),
+                progress=self._on_progress,
+                progress_size=(PREVIEW_W, PREVIEW_H),
+            )
+        except Exception as e:
+            self.dispatch.post(self._on_pipeline_failed, e)
+            return
+        self.dispatch.post(self._on_pipeline_done, out_path, time.perf_counter() - t0)
+
+    def _on_progress(self, event, frame, seconds):
+        self.dispatch.post(self._show_frame, event, frame, seconds)
+
+    def _show_frame(self, event, frame, seconds):
+        if self._first_preview_s is None:
+            self._first_preview_s = seconds
+        self.preview_out_ctkimg = ctk.CTkImage(light_image=frame, dark_image=frame, size=frame.size)
+        self.out_preview_label.configure(image=self.preview_out_ctkimg, text="")
+        if event != "final":
+            self.status_label.configure(text=f"Running pipeline... ({event} {seconds:.2f}s)")
+
+    def _on_pipeline_done(self, out_path, seconds):
+        first = self._first_preview_s
+        timing = f"first preview {first:.2f}s, final {seconds:.2f}s" if first is not None else f"final {seconds:.2f}s"
         print("Pipeline output path:", out_path)
+        print(timing, "|", self.stage_memo.summary())
 
         self.last_output_path = out_path
         self._update_output_preview()
 
         self.status_label.configure(
-            text=f"Done. Saved as {Path(out_path).name}",
+            text=f"Done. Saved as {Path(out_path).name}\n{timing}\n{self.stage_memo.summary()}",
             text_color="gray80"
         )
 
         self.process_button.configure(state="normal")
 
+    def _on_pipeline_failed(self, error):
+        print("Pipeline failed:", repr(error))
+        self.status_label.configure(text=f"Failed: {error}", text_color="#ff5555")
+        self.process_button.configure(state="normal")
+
+    def _on_labels_upgraded(self, run, labels):
+        # CLOTHING_BACKEND=placeholder: the GPT labels arrived (worker thread),
+        # re-render from the memo with them on the Tk thread
+        self.dispatch.post(self._rerender_with_labels, run)
+
+    def _rerender_with_labels(self, run):
+        # the labels belong to `run`; if the image, face or ID changed since,
+        # drop the upgrade rather than re-render something else
+        if run != self._current_run():
+            return
+        if self.last_output_path and str(self.process_button.cget("state")) == "normal":
+            self.status_label.configure(text="Clothing labels updated, re-rendering...")
+            self.on_apply_filters()
+
+    def on_browse_results(self):
+        folder = filedialog.askdirectory(title="Select folder with filtered results")
+        if not folder:
+            return
+
+        paths = sorted(
+            str(p) for p in Path(folder).iterdir()
+            if p.is_file() and p.stem.endswith("_filtered")
+        )
+        if not paths:
+            messagebox.showinfo("No results", "No *_filtered images in that folder.")
+            return
+
+        if self.gallery_window is None or not self.gallery_window.winfo_exists():
+            self.gallery_window = ctk.CTkToplevel(self)
+            self.gallery_window.geometry("760x560")
+            self.gallery_window.grid_columnconfigure(0, weight=1)
+            self.gallery_window.grid_rowconfigure(0, weight=1)
+            self.gallery = GalleryView(
+                self.gallery_window,
+                self.thumbs,
+                on_select=self.on_gallery_select,
+            )
+            self.gallery.grid(row=0, column=0, sticky="nsew", padx=8, pady=8)
+
+        self.gallery_window.title(f"Batch Results — {Path(folder).name} ({len(paths)})")
+        self.gallery.set_paths(paths)
+        self.gallery_window.focus()
+
+    def on_gallery_select(self, path):
+        self.last_output_path = path
+        self._update_output_preview()
+        self.status_label.configure(text=f"Viewing {Path(path).name}", text_color="gray80")
+
 
 if __name__ == "__main__":
+    # pipeline modules report through logging (e.g. the clothing request size)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     app = CyberFilterApp()
     app.mainloop()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: renders real-size images (deselect with -m 'not slow')")
+
+
+@pytest.fixture
+def stub_detectors(monkeypatch):
+    """
+    Fixed-box detectors from bench_memory instead of the YOLO models.
+    """
+    import bench_memory
+    import filters.detector as detector
+    import filters.pipeline as pipeline
+
+    monkeypatch.setattr(detector, "model_face", bench_memory.StubDetector(bench_memory.STUB_FACE_BOX))
+    monkeypatch.setattr(pipeline, "model_body", bench_memory.StubDetector(bench_memory.STUB_BODY_BOX))
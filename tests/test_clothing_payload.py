@@ -0,0 +1,165 @@
+"""
+The clothing request as it goes over the wire: OPENAI_BASE_URL points at a
+local http.server that records every request.
+"""
+import io
+import sys
+import json
+import base64
+import importlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+MAX_SIDE = 512
+MAX_BYTES = 40000
+
+REPLY = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": '{"top": "red polo shirt", "bottom": "blue jeans"}'},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+@pytest.fixture
+def openai_server():
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            requests.append((self.path, json.loads(body)))
+            reply = json.dumps(REPLY).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1", requests
+    server.shutdown()
+    server.server_close()
+
+
+def _import_clothing_ai(monkeypatch, base_url, **env):
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("CLOTHING_MAX_SIDE", str(MAX_SIDE))
+    monkeypatch.setenv("CLOTHING_MAX_BYTES", str(MAX_BYTES))
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    # limits and the client are read at import time
+    sys.modules.pop("filters.clothing_ai", None)
+    return importlib.import_module("filters.clothing_ai")
+
+
+@pytest.fixture
+def clothing_ai(openai_server, monkeypatch):
+    base_url, _ = openai_server
+    yield _import_clothing_ai(monkeypatch, base_url)
+    sys.modules.pop("filters.clothing_ai", None)
+
+
+def _photo_like(w, h):
+    rng = np.random.default_rng(0)
+    arr = np.empty((h, w, 3), dtype=np.float32)
+    arr[..., 0] = np.linspace(40, 220, w)
+    arr[..., 1] = np.linspace(30, 200, h)[:, None]
+    arr[..., 2] = 90
+    arr[h // 5:h // 2, w // 4:3 * w // 4] = (200, 30, 30)
+    arr[h // 2:, w // 4:3 * w // 4] = (40, 60, 140)
+    arr += rng.normal(0, 12, arr.shape)
+    return Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
+
+
+def _sent_image(request):
+    content = request["messages"][0]["content"]
+    url = next(part["image_url"]["url"] for part in content if part["type"] == "image_url")
+    header, b64 = url.split(",", 1)
+    assert header == "data:image/jpeg;base64"
+    return base64.b64decode(b64)
+
+
+def test_payload_within_limits(clothing_ai, openai_server):
+    _, requests = openai_server
+
+    labels = clothing_ai.analyze_clothing_with_gpt(_photo_like(2400, 3200))
+
+    assert labels == ("RED POLO SHIRT", "BLUE JEANS")
+    assert len(requests) == 1
+    path, request = requests[0]
+    assert path.endswith("/chat/completions")
+
+    jpeg = _sent_image(request)
+    assert len(jpeg) <= MAX_BYTES
+    assert max(Image.open(io.BytesIO(jpeg)).size) <= MAX_SIDE
+
+
+def test_small_crop_not_upscaled(clothing_ai, openai_server):
+    _, requests = openai_server
+
+    clothing_ai.analyze_clothing_with_gpt(_photo_like(200, 300))
+
+    jpeg = _sent_image(requests[0][1])
+    assert len(jpeg) <= MAX_BYTES
+    assert Image.open(io.BytesIO(jpeg)).size == (200, 300)
+
+
+def test_quality_lowered_to_fit_budget(openai_server, monkeypatch):
+    base_url, requests = openai_server
+    budget = 5000  # q85 of this crop at 512px is ~8.7 kB
+    clothing_ai = _import_clothing_ai(
+        monkeypatch, base_url, CLOTHING_MAX_BYTES=str(budget), CLOTHING_IMAGE_DETAIL="low",
+    )
+    try:
+        crop = _photo_like(2400, 3200)
+        _, info = clothing_ai.build_clothing_request(crop)
+        clothing_ai.analyze_clothing_with_gpt(crop)
+    finally:
+        sys.modules.pop("filters.clothing_ai", None)
+
+    assert info["quality"] < 85
+    assert info["sent_size"] == (384, 512)
+    request = requests[0][1]
+    assert len(_sent_image(request)) <= budget
+    image_part = next(p for p in request["messages"][0]["content"] if p["type"] == "image_url")
+    assert image_part["image_url"]["detail"] == "low"
+
+
+def test_shrinks_below_max_side_when_lowest_quality_too_big(clothing_ai):
+    data, info = clothing_ai.encode_crop(_photo_like(2400, 3200), max_side=MAX_SIDE, max_bytes=1500)
+
+    assert len(data) <= 1500
+    assert info["quality"] == clothing_ai.JPEG_QUALITIES[-1]
+    assert max(info["sent_size"]) < MAX_SIDE
+    assert Image.open(io.BytesIO(data)).size == info["sent_size"]
+
+
+def test_over_budget_logged_at_min_side(clothing_ai, caplog):
+    with caplog.at_level("WARNING", logger="filters.clothing_ai"):
+        data, info = clothing_ai.encode_crop(_photo_like(2400, 3200), max_bytes=200, min_side=128)
+
+    assert max(info["sent_size"]) == 128
+    assert len(data) > 200
+    assert "over budget" in caplog.text
@@ -0,0 +1,80 @@
+"""
+plan_for_budget with fixed stage costs: which ladder steps get picked.
+"""
+import pytest
+
+from filters.latency_budget import StageCostModel, BudgetPlan, plan_for_budget
+
+SIZE = (4000, 3000)  # 12 MP
+STYLE_OPS = ("tint", "noise", "blur", "unsharp")
+
+# seconds per MP unless noted; round numbers so the estimates are easy to follow
+COSTS = {
+    "load": 0.0,
+    "style.tint": 0.0,
+    "style.noise": 0.1,      # 1.2 s at 12 MP
+    "style.blur": 0.05,
+    "style.unsharp": 0.05,   # sharpen: 1.2 s
+    "detect": 0.1,           # per MP of detector input
+    "clothing": 3.0,         # seconds
+    "compose": 0.0,
+    "final": 0.0,
+    "encode": 0.25,          # 3.0 s
+    "encode_fast": 0.05,     # 0.6 s
+}
+
+
+@pytest.fixture
+def model():
+    return StageCostModel(costs=COSTS)
+
+
+def plan(model, budget, clothing_backend="gpt", size=SIZE):
+    return plan_for_budget(budget, size, model, style_ops=STYLE_OPS, clothing_backend=clothing_backend)
+
+
+def full_estimate(model, clothing_backend="gpt"):
+    return model.estimate(BudgetPlan(), SIZE, style_ops=STYLE_OPS, clothing_backend=clothing_backend)
+
+
+def test_no_budget_is_full_quality(model):
+    p = plan(model, None)
+    assert p.degradations == []
+    assert p.estimate == pytest.approx(full_estimate(model))
+
+
+def test_budget_already_met(model):
+    assert plan(model, full_estimate(model) + 0.1).degradations == []
+
+
+def test_cheapest_prefix_that_fits(model):
+    # full: 3.0 encode + 3.0 clothing + 1.2 detect + 2.4 style = 9.6 s;
+    # fast_encode -> 7.2, cached_labels -> 4.2, detect_1280 -> ~3.1
+    assert full_estimate(model) == pytest.approx(9.6)
+    assert plan(model, 7.5).degradations == ["fast_encode"]
+    assert plan(model, 4.5).degradations == ["fast_encode", "cached_labels"]
+    p = plan(model, 3.5)
+    assert p.degradations == ["fast_encode", "cached_labels", "detect_1280"]
+    assert p.estimate <= 3.5
+
+
+def test_local_backend_skips_cached_labels(model):
+    # the local estimator costs nothing, cached labels wouldn't save anything
+    p = plan(model, 3.5, clothing_backend="local")
+    assert "cached_labels" not in p.degradations
+    assert p.degradations == ["fast_encode", "detect_1280"]
+
+
+def test_small_image_skips_detector_downscale(model):
+    # 1000x750 is already under 1280 px: detect_1280 changes nothing
+    p = plan(model, 0.0, size=(1000, 750))
+    assert "detect_1280" not in p.degradations
+    assert "detect_640" in p.degradations
+
+
+def test_unreachable_budget_applies_every_useful_step(model):
+    p = plan(model, 0.0)
+    assert p.degradations == [
+        "fast_encode", "cached_labels", "detect_1280", "skip_noise", "skip_sharpen", "detect_640",
+    ]
+    assert p.estimate == pytest.approx(0.6 + 0.1 * 0.4)  # fast encode + detector floor
@@ -0,0 +1,21 @@
+"""
+Per-stage (and per style step) peak memory against memory_budgets.json,
+the same check as bench_memory.py on a small input.
+"""
+import pytest
+
+import bench_memory
+
+MEGAPIXELS = 2
+
+
+@pytest.mark.slow
+def test_stages_within_memory_budget(stub_detectors, tmp_path):
+    budgets = bench_memory.load_budgets()
+    if str(MEGAPIXELS) not in budgets:
+        pytest.skip(f"no budget recorded for {MEGAPIXELS} MP (bench_memory.py --update --sizes {MEGAPIXELS})")
+
+    prof = bench_memory.profile_size(MEGAPIXELS, str(tmp_path))
+
+    assert "style.vignette" in prof.stages and "style.noise" in prof.stages
+    assert bench_memory.check(MEGAPIXELS, prof, budgets) == []
@@ -0,0 +1,25 @@
+"""
+The pipeline graph gives the same pixels whether its stages run in
+parallel or one after another.
+"""
+import numpy as np
+
+import bench_memory
+from filters.pipeline import run_pipeline
+
+
+def render(img, path, parallel):
+    run = run_pipeline(path, image=img, parallel=parallel, memo=None, clothing_backend="local",
+                       variants=None, save=False)
+    return np.asarray(run.results["final"])
+
+
+def test_parallel_matches_sequential(stub_detectors, tmp_path):
+    img = bench_memory.synthetic_image(0.5)
+    path = str(tmp_path / "synthetic.png")  # output path only, never read
+
+    sequential = render(img, path, parallel=False)
+    parallel = render(img, path, parallel=True)
+
+    assert sequential.shape == parallel.shape
+    assert np.array_equal(sequential, parallel)
@@ -0,0 +1,28 @@
+"""
+PreviewPublisher keeps delivering frames after one of them fails.
+"""
+import threading
+
+from PIL import Image
+
+from filters.preview import PreviewPublisher
+
+
+def test_failed_frame_does_not_stop_later_frames(caplog):
+    delivered = []
+    style_done = threading.Event()
+
+    def callback(event, frame, seconds):
+        if event == "style":
+            style_done.set()
+            raise ValueError("widget gone")
+        delivered.append((event, frame.size))
+
+    publisher = PreviewPublisher(callback, compose=None, size=(420, 420))
+    publisher.on_stage("style", Image.new("RGB", (1600, 1200)))
+    assert style_done.wait(5)
+    publisher.on_stage("final", Image.new("RGB", (1600, 1200)))
+    publisher.close()
+
+    assert delivered == [("final", (420, 315))]
+    assert "preview frame 'style' failed" in caplog.text
@@ -0,0 +1,89 @@
+"""
+StageGraph scheduling (sequential and parallel) and StageRun.critical_path.
+"""
+import threading
+import time
+
+import pytest
+
+from filters.stage_graph import StageGraph, StageRun
+
+
+def diamond(log):
+    """
+    a -> b, c -> d; each stage appends (name, its args) to log when it runs.
+    """
+    lock = threading.Lock()
+
+    def stage(name, compute, delay=0.0):
+        def fn(*args):
+            time.sleep(delay)
+            with lock:
+                log.append((name, args))
+            return compute(*args)
+        return fn
+
+    g = StageGraph()
+    g.add("a", stage("a", lambda: 1))
+    g.add("b", stage("b", lambda a: a + 1, delay=0.02), deps=["a"])
+    g.add("c", stage("c", lambda a: a + 2), deps=["a"])
+    g.add("d", stage("d", lambda b, c: b + c), deps=["b", "c"])
+    return g
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_stages_run_after_their_deps(parallel):
+    log = []
+    run = diamond(log).run(parallel=parallel)
+
+    order = [name for name, _ in log]
+    assert order[0] == "a" and order[-1] == "d"
+    assert sorted(order[1:3]) == ["b", "c"]
+    assert dict(log)["d"] == (2, 3)  # deps' results, in declared order
+    assert run.results == {"a": 1, "b": 2, "c": 3, "d": 5}
+    for name in ("b", "c"):
+        assert run.timings[name][0] >= run.timings["a"][1]
+        assert run.timings["d"][0] >= run.timings[name][1]
+
+
+def test_on_stage_sees_every_result():
+    seen = {}
+    diamond([]).run(parallel=True, on_stage=seen.__setitem__)
+    assert seen == {"a": 1, "b": 2, "c": 3, "d": 5}
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_stage_error_propagates_and_stops_dependents(parallel):
+    ran = []
+    g = StageGraph()
+    g.add("a", lambda: 1)
+    g.add("boom", lambda a: 1 / 0, deps=["a"])
+    g.add("after", lambda x: ran.append("after"), deps=["boom"])
+
+    with pytest.raises(ZeroDivisionError):
+        g.run(parallel=parallel)
+    assert ran == []
+
+
+def test_unknown_and_duplicate_stages_rejected():
+    g = StageGraph().add("a", lambda: 1)
+    with pytest.raises(ValueError):
+        g.add("a", lambda: 2)
+    with pytest.raises(ValueError):
+        g.add("b", lambda x: x, deps=["missing"])
+
+
+def test_critical_path_follows_longest_chain():
+    g = diamond([])
+    # a 0-1, b 1-4 (slow), c 1-2, d 4-5
+    timings = {"a": (0.0, 1.0), "b": (1.0, 4.0), "c": (1.0, 2.0), "d": (4.0, 5.0)}
+    run = StageRun(g, {}, timings, wall=5.0)
+
+    path, total = run.critical_path()
+    assert path == ["a", "b", "d"]
+    assert total == pytest.approx(5.0)
+    assert "critical path: a -> b -> d" in run.report()
+
+
+def test_critical_path_empty_graph():
+    assert StageRun(StageGraph(), {}, {}, wall=0.0).critical_path() == ([], 0.0)
@@ -0,0 +1,75 @@
+"""
+Compiled presets against the per-op PIL pipeline they replace.
+"""
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+
+import bench_memory
+from filters.style_presets import ColorLUT, apply_preset, compile_preset, get_preset
+from filters.stylistic_filters import add_noise, make_vignette_mask
+
+TINT = (20, 110, 120)
+
+
+@pytest.fixture(scope="module")
+def img():
+    return bench_memory.synthetic_image(0.3)
+
+
+def tint(img, color=TINT, strength=0.22):
+    return Image.blend(img, Image.new("RGB", img.size, color), strength)
+
+
+def vignette(img, strength=0.85, darkness=0.45):
+    mask = make_vignette_mask(img.size, strength)
+    dark = Image.new("RGB", img.size, (0, 0, 0))
+    return Image.composite(Image.blend(img, dark, darkness), img, ImageOps.invert(mask))
+
+
+def old_cyber(img):
+    # the styling before presets: one full-image pass per op
+    img = vignette(tint(img))
+    img = add_noise(img, 0.06)
+    img = ImageEnhance.Contrast(img).enhance(1.18)
+    img = img.filter(ImageFilter.GaussianBlur(0.6))
+    return img.filter(ImageFilter.UnsharpMask(radius=1.2, percent=140, threshold=3))
+
+
+def diff(a, b):
+    return np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16))
+
+
+def test_cyber_classic_matches_per_op_output(img):
+    assert diff(apply_preset(img, "cyber_classic"), old_cyber(img)).max() == 0
+
+
+def test_cyber_fuses_tint_and_contrast(img):
+    labels = [label for label, _ in compile_preset("cyber")]
+    assert labels == ["tint+contrast", "vignette", "noise", "blur", "unsharp"]
+
+    # the fused table is exact: same pixels as blend + ImageEnhance.Contrast
+    fused = ColorLUT(get_preset("cyber")[:2])
+    expected = ImageEnhance.Contrast(tint(img)).enhance(1.18)
+    assert diff(fused(img), expected).max() == 0
+
+
+def test_cyber_stays_close_to_classic_look(img):
+    # contrast now runs before vignette + noise instead of after them
+    d = diff(apply_preset(img, "cyber"), old_cyber(img))
+    assert d.mean() < 10
+    assert np.percentile(d, 99) < 40
+
+
+def test_saturation_lut_within_interpolation_error(img):
+    ops = get_preset("neon")[:4]
+    assert [op["op"] for op in ops] == ["tint", "saturation", "contrast", "gamma"]
+
+    expected = ImageEnhance.Color(tint(img, (150, 20, 160), 0.18)).enhance(1.35)
+    expected = Image.blend(Image.new("RGB", img.size, (128, 128, 128)), expected, 1.25)
+    expected = expected.point(lambda v: round(255 * (v / 255) ** 0.92))
+
+    # trilinear interpolation on the 33^3 grid: a few levels at worst, well under one on average
+    d = diff(ColorLUT(ops)(img), expected)
+    assert d.max() <= 8
+    assert d.mean() < 1.0
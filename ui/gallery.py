@@ -0,0 +1,173 @@
+import os
+import tkinter as tk
+
+import customtkinter as ctk
+from PIL import ImageTk
+
+from ui.thumbnail_cache import THUMB_SIZE
+from ui.tk_dispatch import TkDispatcher
+
+CELL_PAD = 10
+LABEL_H = 18
+
+
+class GalleryView(ctk.CTkFrame):
+    """
+    Virtualized thumbnail grid. Only cells in (or just around) the visible
+    rows have canvas items; thumbnails are requested from the ThumbnailCache
+    as their row scrolls into view and dropped when it scrolls out.
+    """
+
+    def __init__(self, master, thumbs, on_select=None, thumb_size=THUMB_SIZE, **kwargs):
+        super().__init__(master, **kwargs)
+        self.thumbs = thumbs
+        self.on_select = on_select
+        self.thumb_size = thumb_size
+        self.cell_w = thumb_size[0] + CELL_PAD * 2
+        self.cell_h = thumb_size[1] + LABEL_H + CELL_PAD * 2
+
+        self.paths = []
+        self.cols = 1
+        self._cells = {}   # index -> (image_item, text_item, PhotoImage or None)
+        self._dispatch = TkDispatcher(self)  # thumbnails arrive on pool threads
+        self.bind("<Destroy>", self._on_destroy)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.canvas = tk.Canvas(self, bg="gray12", highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+
+        self.canvas.bind("<Configure>", lambda e: self._relayout())
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self._scroll_units(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll_units(1))
+        self.canvas.bind("<Button-1>", self._on_click)
+
+    # =========================
+    # DATA
+    # =========================
+    def set_paths(self, paths):
+        self.paths = list(paths)
+        self._clear_cells()
+        self.canvas.yview_moveto(0)
+        self._relayout()
+
+    def _clear_cells(self):
+        for image_item, text_item, _ in self._cells.values():
+            self.canvas.delete(image_item)
+            self.canvas.delete(text_item)
+        self._cells = {}
+
+    # =========================
+    # SCROLLING
+    # =========================
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._refresh()
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._refresh()
+
+    def _on_wheel(self, event):
+        self._scroll_units(-1 if event.delta > 0 else 1)
+
+    def _scroll_units(self, n):
+        self.canvas.yview_scroll(n, "units")
+        self._refresh()
+
+    # =========================
+    # LAYOUT + VIRTUALIZATION
+    # =========================
+    def _relayout(self):
+        width = max(self.canvas.winfo_width(), self.cell_w)
+        cols = max(1, width // self.cell_w)
+        if cols != self.cols:
+            self.cols = cols
+            self._clear_cells()
+
+        rows = -(-len(self.paths) // self.cols)
+        self.canvas.configure(
+            scrollregion=(0, 0, width, rows * self.cell_h),
+            yscrollincrement=self.cell_h // 4,
+        )
+        self._refresh()
+
+    def _visible_range(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first_row = max(0, int(top // self.cell_h) - 1)
+        last_row = int(bottom // self.cell_h) + 1
+        first = first_row * self.cols
+        last = min(len(self.paths), (last_row + 1) * self.cols)
+        return first, last
+
+    def _refresh(self):
+        if not self.paths:
+            return
+        first, last = self._visible_range()
+
+        # drop cells that scrolled out
+        for index in [i for i in self._cells if i < first or i >= last]:
+            image_item, text_item, _ = self._cells.pop(index)
+            self.canvas.delete(image_item)
+            self.canvas.delete(text_item)
+
+        # create cells that scrolled in
+        for index in range(first, last):
+            if index in self._cells:
+                continue
+            row, col = divmod(index, self.cols)
+            x = col * self.cell_w + self.cell_w // 2
+            y = row * self.cell_h + CELL_PAD
+
+            image_item = self.canvas.create_image(x, y + self.thumb_size[1] // 2, anchor="center")
+            text_item = self.canvas.create_text(
+                x, y + self.thumb_size[1] + 4,
+                anchor="n",
+                text=self._short_name(self.paths[index]),
+                fill="gray80",
+                font=("TkDefaultFont", 9),
+            )
+            self._cells[index] = (image_item, text_item, None)
+
+            path = self.paths[index]
+            self.thumbs.request(
+                path,
+                lambda p, img, i=index: self._dispatch.post(self._on_thumb_ready, i, p, img),
+                size=self.thumb_size,
+            )
+
+    def _on_thumb_ready(self, index, path, img):
+        cell = self._cells.get(index)
+        if cell is None or img is None or self.paths[index] != path:
+            return  # scrolled away or list changed
+        image_item, text_item, _ = cell
+        photo = ImageTk.PhotoImage(img)
+        self.canvas.itemconfigure(image_item, image=photo)
+        self._cells[index] = (image_item, text_item, photo)  # keep a reference
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._dispatch.close()
+
+    def _short_name(self, path, max_len=22):
+        name = os.path.basename(path)
+        return name if len(name) <= max_len else name[: max_len - 1] + "…"
+
+    def _on_click(self, event):
+        if self.on_select is None:
+            return
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
+        col = int(x // self.cell_w)
+        if col >= self.cols:
+            return
+        index = int(y // self.cell_h) * self.cols + col
+        if 0 <= index < len(self.paths):
+            self.on_select(self.paths[index])
@@ -0,0 +1,166 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+THUMB_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cyberstyle", "thumbs")
+THUMB_SIZE = (160, 160)
+THUMB_MAX_BYTES = int(os.getenv("THUMB_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+# eviction goes this far below max_bytes, so it doesn't rescan on every write
+EVICT_TO = 0.8
+
+
+class ThumbnailCache:
+    """
+    Thumbnails keyed by (path, mtime, size), kept on disk as JPEGs (PNG with
+    lossless=True) and in a small in-memory LRU. The directory is capped at
+    max_bytes, least recently used files go first. Builds run on a thread
+    pool; callbacks are called from the worker thread, so GUI code should
+    hand them to the Tk thread (ui.tk_dispatch).
+    """
+
+    def __init__(self, root=THUMB_DIR, workers=4, memory_items=512, max_bytes=THUMB_MAX_BYTES):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # measured on the first write
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+        self._inflight = {}
+
+    def _key(self, path, size, lossless=False):
+        st = os.stat(path)
+        fmt = "png" if lossless else "jpg"
+        raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{size[0]}x{size[1]}|{fmt}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, img):
+        with self._lock:
+            self._mem[key] = img
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.memory_items:
+                self._mem.popitem(last=False)
+
+    def cached(self, path, size=THUMB_SIZE):
+        """
+        Thumbnail if it's already in memory, else None (never decodes).
+        """
+        try:
+            key = self._key(path, size)
+        except OSError:
+            return None
+        with self._lock:
+            img = self._mem.get(key)
+            if img is not None:
+                self._mem.move_to_end(key)
+            return img
+
+    def get(self, path, size=THUMB_SIZE, lossless=False):
+        """
+        Thumbnail for `path`, built (and stored on disk) if needed.
+        lossless=True stores it as PNG instead of a q85 JPEG (for previews).
+        Runs in the caller's thread.
+        """
+        key = self._key(path, size, lossless)
+        with self._lock:
+            img = self._mem.get(key)
+        if img is not None:
+            return img
+
+        disk_path = os.path.join(self.root, key + (".png" if lossless else ".jpg"))
+        try:
+            img = Image.open(disk_path)
+            img.load()
+            os.utime(disk_path)  # LRU: eviction goes by mtime
+        except (OSError, ValueError):
+            img = Image.open(path)
+            img.draft("RGB", size)  # JPEG: decode at reduced scale
+            img = img.convert("RGB")
+            img.thumbnail(size, Image.LANCZOS)
+            tmp = f"{disk_path}.{threading.get_ident()}.tmp"
+            if lossless:
+                img.save(tmp, format="PNG", compress_level=1)
+            else:
+                img.save(tmp, format="JPEG", quality=85)
+            os.replace(tmp, disk_path)
+            self._added(os.path.getsize(disk_path))
+
+        self._remember(key, img)
+        return img
+
+    # ---- disk size cap ----
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith((".jpg", ".png")):
+                continue
+            p = os.path.join(self.root, name)
+            try:
+                st = os.stat(p)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        return entries
+
+    def _added(self, nbytes):
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._disk_bytes += nbytes
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used thumbnails until the directory is at
+        EVICT_TO of max_bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_bytes = total
+
+    def request(self, path, callback, size=THUMB_SIZE):
+        """
+        Build the thumbnail in the background and call callback(path, img)
+        (img is None if the file can't be read).
+        """
+        img = self.cached(path, size)
+        if img is not None:
+            callback(path, img)
+            return
+
+        def job():
+            try:
+                result = self.get(path, size)
+            except (OSError, ValueError):
+                result = None
+            with self._lock:
+                waiters = self._inflight.pop((path, size), [])
+            for cb in waiters:
+                cb(path, result)
+
+        with self._lock:
+            waiters = self._inflight.get((path, size))
+            if waiters is not None:
+                waiters.append(callback)
+                return
+            self._inflight[(path, size)] = [callback]
+        self._pool.submit(job)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
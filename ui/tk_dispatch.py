@@ -0,0 +1,43 @@
+"""
+Hand results from background threads to the Tk thread.
+
+Tk isn't thread-safe (widget.after included), so worker threads only put
+callables on a queue.Queue and the Tk thread drains it on an after() timer.
+
+    dispatch = TkDispatcher(root)
+    dispatch.post(label.configure, text="done")   # from any thread
+"""
+import queue
+
+POLL_MS = 30
+
+
+class TkDispatcher:
+    def __init__(self, widget, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._q = queue.Queue()
+        self._closed = False
+        self._after_id = widget.after(poll_ms, self._poll)
+
+    def post(self, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs) on the Tk thread. Safe from any thread.
+        """
+        self._q.put((fn, args, kwargs))
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    fn, args, kwargs = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                fn(*args, **kwargs)
+        finally:
+            if not self._closed:
+                self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+    def close(self):
+        self._closed = True
+        self.widget.after_cancel(self._after_id)
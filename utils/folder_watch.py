@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".tif"}
+
+# inotify flags (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_candidate(path):
+    """
+    Input images only: skip our own outputs and temp/hidden files.
+    """
+    name = os.path.basename(path)
+    stem, ext = os.path.splitext(name)
+    return (
+        ext.lower() in IMAGE_EXTS
+        and not stem.endswith("_filtered")
+        and not name.startswith(".")
+    )
+
+
+def scan(dirs):
+    for d in dirs:
+        try:
+            entries = list(os.scandir(d))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_file() and is_candidate(entry.path):
+                yield entry.path
+
+
+class PollingWatcher:
+    """
+    Fallback: rescan the directories every `interval` seconds and report
+    files whose size/mtime changed.
+    """
+
+    def __init__(self, dirs, interval=2.0):
+        self.dirs = dirs
+        self.interval = interval
+        self._seen = {}
+        self._last = 0.0
+
+    def poll(self, timeout):
+        wait = self._last + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if self._last + self.interval > time.monotonic():
+                return []
+        self._last = time.monotonic()
+
+        changed = []
+        for path in scan(self.dirs):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            if self._seen.get(path) != sig:
+                self._seen[path] = sig
+                changed.append(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Linux inotify via libc (no extra dependency).
+    Reports files on create / close-after-write / move-in.
+    """
+
+    def __init__(self, dirs):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._wd = {}
+        self.overflowed = False
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        for d in dirs:
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(d), mask)
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(err, f"inotify_add_watch failed for {d}")
+            self._wd[wd] = d
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        changed = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True  # caller should rescan
+                continue
+            if wd in self._wd and name:
+                path = os.path.join(self._wd[wd], os.fsdecode(name))
+                if is_candidate(path):
+                    changed.append(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(dirs, poll_interval=2.0):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(dirs)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(dirs, interval=poll_interval)
+
+
+class Debouncer:
+    """
+    A file is ready once its size/mtime haven't changed for `settle` seconds
+    (i.e. the writer has finished).
+    """
+
+    def __init__(self, settle=2.0):
+        self.settle = settle
+        self._pending = {}  # path -> (sig, last_change)
+
+    def touch(self, path):
+        self._check(path, time.monotonic())
+
+    def _check(self, path, now):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._pending.pop(path, None)
+            return None
+        sig = (st.st_size, st.st_mtime_ns)
+        old = self._pending.get(path)
+        if old is None or old[0] != sig:
+            self._pending[path] = (sig, now)
+        return sig
+
+    def ready(self):
+        """
+        [(path, size, mtime_ns)] for files that have settled.
+        """
+        now = time.monotonic()
+        out = []
+        for path in list(self._pending):
+            sig = self._check(path, now)
+            if sig is None:
+                continue
+            _, since = self._pending[path]
+            if sig[0] > 0 and now - since >= self.settle:
+                del self._pending[path]
+                out.append((path, sig[0], sig[1]))
+        return out
+
+    def __len__(self):
+        return len(self._pending)
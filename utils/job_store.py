@@ -0,0 +1,108 @@
+import os
+import time
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    state     TEXT NOT NULL,          -- queued | running | done | failed
+    out_path  TEXT,
+    error     TEXT,
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    updated   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, updated);
+"""
+
+
+class JobStore:
+    """
+    Persistent job state for the watch-folder daemon (SQLite).
+    A file is identified by path + size + mtime: a finished file is
+    never reprocessed unless it changes on disk.
+    """
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _exec(self, sql, args=()):
+        with self._lock, self.db:
+            return self.db.execute(sql, args).fetchall()
+
+    def requeue_interrupted(self):
+        """
+        Jobs left 'running' by a previous process go back to the queue.
+        """
+        self._exec(
+            "UPDATE jobs SET state='queued', updated=? WHERE state='running'", (time.time(),)
+        )
+
+    def needs_processing(self, path, size, mtime_ns):
+        rows = self._exec("SELECT size, mtime_ns, state FROM jobs WHERE path=?", (path,))
+        if not rows:
+            return True
+        old_size, old_mtime, state = rows[0]
+        if (old_size, old_mtime) != (size, mtime_ns):
+            return True  # file was replaced
+        return False     # queued / running / done / failed with the same content
+
+    def enqueue(self, path, size, mtime_ns):
+        self._exec(
+            "INSERT INTO jobs(path, size, mtime_ns, state, updated) VALUES (?, ?, ?, 'queued', ?) "
+            "ON CONFLICT(path) DO UPDATE SET size=excluded.size, mtime_ns=excluded.mtime_ns, "
+            "state='queued', out_path=NULL, error=NULL, attempts=0, updated=excluded.updated",
+            (path, size, mtime_ns, time.time()),
+        )
+
+    def next_queued(self, limit):
+        rows = self._exec(
+            "SELECT path FROM jobs WHERE state='queued' ORDER BY updated LIMIT ?", (limit,)
+        )
+        return [r[0] for r in rows]
+
+    def mark_running(self, path):
+        self._exec(
+            "UPDATE jobs SET state='running', attempts=attempts+1, updated=? WHERE path=?",
+            (time.time(), path),
+        )
+
+    def mark_done(self, path, out_path):
+        self._exec(
+            "UPDATE jobs SET state='done', out_path=?, error=NULL, updated=? WHERE path=?",
+            (out_path, time.time(), path),
+        )
+
+    def mark_failed(self, path, error, max_attempts=3):
+        rows = self._exec("SELECT attempts FROM jobs WHERE path=?", (path,))
+        attempts = rows[0][0] if rows else max_attempts
+        state = "queued" if attempts < max_attempts else "failed"
+        self._exec(
+            "UPDATE jobs SET state=?, error=?, updated=? WHERE path=?",
+            (state, error, time.time(), path),
+        )
+
+    def requeue(self, path, error):
+        """
+        Back to queued without using up an attempt (the job wasn't at fault).
+        """
+        self._exec(
+            "UPDATE jobs SET state='queued', attempts=MAX(0, attempts-1), error=?, updated=?"
+            " WHERE path=?",
+            (error, time.time(), path),
+        )
+
+    def counts(self):
+        rows = self._exec("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        self.db.close()
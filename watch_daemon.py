@@ -0,0 +1,258 @@
+"""
+Watch-folder daemon: new photos dropped into the watched folders are
+rendered automatically (output written next to the input as *_filtered.png).
+
+    python watch_daemon.py incoming/ other/ --workers 4 --id PAX
+    python watch_daemon.py --status
+
+Job state lives in a SQLite file, so a restart picks up queued and
+interrupted jobs and never reprocesses finished files.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.job_store import JobStore
+from filters.detector import add_cascade_stats
+from utils.folder_watch import make_watcher, scan, Debouncer, InotifyWatcher
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".cache", "cyberstyle", "jobs.sqlite3")
+
+log = logging.getLogger("watch_daemon")
+
+
+class WatchDaemon:
+    def __init__(self, dirs, store, workers=None, id_value="UNKNOWN", settle=2.0,
+                 poll_interval=2.0, cache_dir=None, stats_interval=30.0):
+        from filters.worker_pool import default_workers
+
+        self.dirs = [os.path.abspath(d) for d in dirs]
+        self.store = store
+        self.workers = workers or default_workers()
+        self.id_value = id_value
+        self.cache_dir = cache_dir
+        self.stats_interval = stats_interval
+
+        self.watcher = make_watcher(self.dirs, poll_interval=poll_interval)
+        self.debouncer = Debouncer(settle=settle)
+        self.executor = self._new_executor()
+        self.inflight = {}               # future -> path
+        self._finished = deque()         # completion times, for the rate
+        self._started = time.monotonic()
+        self._stop = False
+        self.pool_restarts = 0
+        self.cache_hits = 0
+        self.saved_seconds = 0.0         # compute the result cache stood in for
+        self.face_cascade = {}           # cascade runs / fallbacks over all renders
+        self._isolate = False            # one job at a time after a crash
+
+    def _new_executor(self):
+        from filters.worker_pool import make_process_executor
+
+        return make_process_executor(self.workers)
+
+    def _restart_executor(self):
+        # a worker died (e.g. OOM-killed): the pool is unusable from now on
+        log.warning("worker pool broken, starting a new one")
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._new_executor()
+        self.pool_restarts += 1
+
+    # =========================
+    # STATUS
+    # =========================
+    def rate_per_min(self, window=300.0):
+        now = time.monotonic()
+        while self._finished and now - self._finished[0] > window:
+            self._finished.popleft()
+        span = min(window, max(1.0, now - self._started))
+        return len(self._finished) * 60.0 / span
+
+    def status(self):
+        counts = self.store.counts()
+        return {
+            "queue_depth": counts["queued"],
+            "running": len(self.inflight),
+            "settling": len(self.debouncer),
+            "done": counts["done"],
+            "failed": counts["failed"],
+            "rate_per_min": round(self.rate_per_min(), 2),
+            "pool_restarts": self.pool_restarts,
+            "cache_hits": self.cache_hits,
+            "cache_saved_s": round(self.saved_seconds, 1),
+            "face_cascade": self.face_cascade,
+        }
+
+    # =========================
+    # LOOP
+    # =========================
+    def _discover(self, paths):
+        for path in paths:
+            self.debouncer.touch(path)
+
+        for path, size, mtime_ns in self.debouncer.ready():
+            if self.store.needs_processing(path, size, mtime_ns):
+                self.store.enqueue(path, size, mtime_ns)
+                log.info("queued %s", path)
+
+    def _dispatch(self):
+        from filters.worker_pool import render_path
+
+        free = self.workers * 2 - len(self.inflight)  # keep workers fed
+        if self._isolate:
+            free = 1 - len(self.inflight)
+        if free <= 0:
+            return
+        for path in self.store.next_queued(free):
+            if not os.path.exists(path):
+                self.store.mark_failed(path, "file disappeared", max_attempts=0)
+                continue
+            kwargs = {"id_value": self.id_value, "cache_dir": self.cache_dir}
+            try:
+                fut = self.executor.submit(render_path, path, **kwargs)
+            except BrokenProcessPool:
+                self._restart_executor()
+                fut = self.executor.submit(render_path, path, **kwargs)
+            self.store.mark_running(path)
+            self.inflight[fut] = path
+
+    def _collect(self, timeout):
+        if not self.inflight:
+            return
+        done, _ = wait(self.inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+        dead = []
+        for fut in done:
+            path = self.inflight.pop(fut)
+            try:
+                out_path, info = fut.result()
+            except BrokenProcessPool:
+                dead.append(path)
+                continue
+            except Exception as e:
+                log.warning("failed %s: %r", path, e)
+                self.store.mark_failed(path, repr(e))
+                continue
+            self.store.mark_done(path, out_path)
+            self.cache_hits += info["cache_hit"]
+            self.saved_seconds += info["saved_seconds"]
+            if "face_cascade" in info:
+                add_cascade_stats(self.face_cascade, info["face_cascade"])
+            self._finished.append(time.monotonic())
+            self._isolate = False
+            log.info("done %s -> %s", path, out_path)
+
+        if dead:
+            self._recover(dead)
+
+    def _recover(self, dead):
+        """
+        A worker died (e.g. OOM-killed) and took the pool with it: put its
+        jobs back and start a fresh pool.
+        """
+        dead += list(self.inflight.values())  # these died with the pool
+        self.inflight.clear()
+        error = "worker process died"
+        if self._stop:
+            # shutting down (e.g. a signal reached the workers too): not the
+            # jobs' fault, and no new pool; they run again on the next start
+            for path in dead:
+                self.store.requeue(path, error)
+            return
+        if len(dead) == 1:
+            # it ran alone, so it's the one killing its worker
+            self.store.mark_failed(dead[0], error)
+        else:
+            # can't tell which one did it: requeue them all (attempts not
+            # counted) and run one at a time until something succeeds
+            for path in dead:
+                self.store.requeue(path, error)
+            self._isolate = True
+        self._restart_executor()
+
+    def run(self):
+        self._started = time.monotonic()
+        self.store.requeue_interrupted()
+        self._discover(scan(self.dirs))  # files that arrived while we were down
+
+        log.info(
+            "watching %s with %s, %d workers",
+            ", ".join(self.dirs), type(self.watcher).__name__, self.workers,
+        )
+        last_stats = time.monotonic()
+
+        while not self._stop:
+            changed = self.watcher.poll(timeout=0.2 if self.inflight else 0.5)
+            if isinstance(self.watcher, InotifyWatcher) and self.watcher.overflowed:
+                self.watcher.overflowed = False
+                changed = list(scan(self.dirs))
+            self._discover(changed)
+            self._dispatch()
+            self._collect(timeout=0.05)
+
+            if time.monotonic() - last_stats >= self.stats_interval:
+                last_stats = time.monotonic()
+                log.info("status %s", self.status())
+
+        self.shutdown()
+
+    def stop(self, *_):
+        self._stop = True
+
+    def shutdown(self):
+        log.info("shutting down, waiting for %d running jobs", len(self.inflight))
+        while self.inflight:
+            self._collect(timeout=None)
+        self.executor.shutdown()
+        self.watcher.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render photos dropped into watched folders.")
+    ap.add_argument("dirs", nargs="*")
+    ap.add_argument("--db", default=DEFAULT_DB)
+    ap.add_argument("--workers", type=int, default=None, help="default: tuning profile, else cores / 2")
+    ap.add_argument("--id", dest="id_value", default="UNKNOWN")
+    ap.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged")
+    ap.add_argument("--poll-interval", type=float, default=2.0, help="polling fallback interval")
+    ap.add_argument("--cache-dir", default=None, help="enable the on-disk result cache")
+    ap.add_argument("--stats-interval", type=float, default=30.0)
+    ap.add_argument("--status", action="store_true", help="print job counts and exit")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    store = JobStore(args.db)
+
+    if args.status:
+        print(store.counts())
+        return 0
+    if not args.dirs:
+        ap.error("at least one directory to watch is required")
+
+    daemon = WatchDaemon(
+        args.dirs,
+        store,
+        workers=args.workers,
+        id_value=args.id_value,
+        settle=args.settle,
+        poll_interval=args.poll_interval,
+        cache_dir=args.cache_dir,
+        stats_interval=args.stats_interval,
+    )
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())